@@ -0,0 +1,42 @@
+"""
+Measure the cold-start cost of short-lived jobs: a fresh interpreter
+importing pywikiapi and creating a Site object.
+Run from the repo root with:  PYTHONPATH=. python3 benchmarks/startup.py
+For a per-module breakdown, use:  python3 -X importtime -c "import pywikiapi"
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = [
+    ('python (baseline)', 'pass'),
+    ('import pywikiapi', 'import pywikiapi'),
+    ('Site()', 'import pywikiapi; pywikiapi.Site("https://example.org/w/api.php")'),
+    ('Site(UrllibSession)', 'import pywikiapi; from pywikiapi.transport import '
+                            'UrllibSession; pywikiapi.Site("https://example.org/w/api.php", '
+                            'session=UrllibSession()).session'),
+    ('Site().session', 'import pywikiapi; pywikiapi.Site("https://example.org/w/api.php")'
+                       '.session'),
+]
+
+
+def run(code, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(repeat=15):
+    base = None
+    for name, code in SCENARIOS:
+        median = run(code, repeat)
+        base = base if base is not None else median
+        print(f'{name:>20}: {median * 1000:6.1f} ms, +{(median - base) * 1000:5.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
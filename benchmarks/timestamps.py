@@ -0,0 +1,39 @@
+"""
+Compare timestamp conversion speed against the original strptime() approach.
+Run from the repo root with:  PYTHONPATH=. python3 benchmarks/timestamps.py
+"""
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from pywikiapi import to_datetime, to_epochs, to_datetime64, to_timestamp
+
+
+def strptime(ts):
+    return datetime.strptime(ts, '%Y-%m-%dT%H:%M:%SZ')
+
+
+def main(count=100000, repeat=3):
+    start = datetime(2001, 1, 15)
+    values = [to_timestamp(start + timedelta(seconds=random.randrange(800000000)))
+              for _ in range(count)]
+    tests = [
+        ('strptime (original)', lambda: [strptime(v) for v in values]),
+        ('to_datetime', lambda: [to_datetime(v) for v in values]),
+        ('to_epochs', lambda: to_epochs(values)),
+    ]
+    try:
+        import numpy
+        tests.append(('to_datetime64', lambda: to_datetime64(values)))
+    except ImportError:
+        print('numpy is not installed, skipping to_datetime64')
+
+    base = None
+    for name, func in tests:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        base = base or best
+        print(f'{name:>20}: {best * 1e9 / count:8.0f} ns/value, {base / best:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
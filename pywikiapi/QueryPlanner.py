@@ -0,0 +1,220 @@
+from .utils import ApiPagesModifiedError
+
+# Query parameters that affect the results of all props, so two requests
+# can only be merged if these are identical (or absent from both)
+GLOBAL_PARAMS = {'redirects', 'converttitles', 'export', 'exportnowrap', 'iwurl',
+                 'indexpageids', 'list', 'meta', 'generator'}
+
+
+class PlannedQuery:
+    """
+    A single query_pages() request added to the QueryPlanner
+    * key: 'titles' or 'pageids'
+    * ids: list of requested titles or page ids
+    * props: list of requested props
+    * params: all other query parameters
+    * pages: list of page objects in the order of ids, set by QueryPlanner.run()
+    """
+
+    def __init__(self, key, ids, props, params):
+        self.key = key
+        self.ids = ids
+        self.props = props
+        self.params = params
+        self.pages = None
+
+
+class _QueryGroup:
+    """Several planned queries that will be executed together"""
+
+    def __init__(self, query):
+        self.key = query.key
+        self.props = list(query.props)
+        self.params = dict(query.params)
+        self.queries = [query]
+
+    def is_compatible(self, query):
+        if self.key != query.key:
+            return False
+        for k in self.params.keys() | query.params.keys():
+            if k in self.params and k in query.params:
+                if self.params[k] != query.params[k]:
+                    return False
+            elif k in GLOBAL_PARAMS:
+                return False
+        return True
+
+    def add(self, query):
+        self.props.extend(p for p in query.props if p not in self.props)
+        self.params.update(query.params)
+        self.queries.append(query)
+
+
+class QueryPlanner:
+    """
+    Collects several query_pages() requests for overlapping sets of pages,
+    and executes them with as few multi-prop, multi-title API calls as possible.
+    Each page is only requested with the props of the requests that asked for it,
+    so pages requested by several requests are fetched once with all their props.
+    Page objects are shared between requests.
+
+        planner = QueryPlanner(site)
+        info = planner.add(titles=titles, prop='info')
+        cats = planner.add(titles=titles, prop='categories', cllimit='max')
+        planner.run()
+        for page in cats.pages:
+            print(page['title'], page.get('categories'))
+    """
+
+    def __init__(self, site, max_ids=50):
+        """
+        :param Site site: the site to query
+        :param int max_ids: maximum number of titles or page ids per API call,
+            500 for bots, 50 otherwise
+        """
+        self.site = site
+        self.max_ids = max_ids
+        self.pending = []
+
+    def add(self, titles=None, pageids=None, prop=None, **kwargs):
+        """
+        Add a query_pages() request to be executed by the run()
+        :param titles: a title or an iterable of page titles
+        :param pageids: a page id or an iterable of page ids, if titles is not given
+        :param prop: a prop name or an iterable of prop names
+        :param kwargs: any other query API parameters
+        :rtype PlannedQuery
+        """
+        if (titles is None) == (pageids is None):
+            raise ValueError('Either titles or pageids must be given')
+        if 'generator' in kwargs:
+            raise ValueError('Generators are not supported by the QueryPlanner')
+        if titles is not None:
+            key, ids = 'titles', [titles] if isinstance(titles, str) else list(titles)
+        else:
+            key, ids = 'pageids', [int(v) for v in (
+                [pageids] if isinstance(pageids, (str, int)) else pageids)]
+        if prop is None:
+            props = []
+        elif isinstance(prop, str):
+            props = prop.split('|')
+        else:
+            props = list(prop)
+        query = PlannedQuery(key, ids, props, kwargs)
+        self.pending.append(query)
+        return query
+
+    def plan(self):
+        """
+        Group all pending requests, merging the compatible ones. Each group
+        will be executed with as few API calls as possible, splitting its pages
+        by the combination of requests that want them.
+        :rtype list
+        """
+        groups = []
+        for query in self.pending:
+            for group in groups:
+                if group.is_compatible(query):
+                    group.add(query)
+                    break
+            else:
+                groups.append(_QueryGroup(query))
+        return groups
+
+    def run(self):
+        """
+        Execute all pending requests, setting the .pages of each PlannedQuery.
+        If any of the pages change during execution, ApiPagesModifiedError(list)
+        will be thrown after all requests have been processed.
+        """
+        groups = self.plan()
+        self.pending = []
+        modified = []
+        for group in groups:
+            modified.extend(self._run_group(group))
+        if modified:
+            raise ApiPagesModifiedError(modified)
+
+    def _run_group(self, group):
+        pages = {}
+        aliases = {}
+        modified = []
+        for props, params, ids in _split_group(group):
+            for start in range(0, len(ids), self.max_ids):
+                results = self.site.query(**{group.key: ids[start:start + self.max_ids]},
+                                          prop=props or None, **params)
+                try:
+                    for page in self.site._query_pages(_collect_aliases(results, aliases)):
+                        key = page.get('title', page.get('pageid')) \
+                            if group.key == 'titles' else page['pageid']
+                        if key in pages:
+                            # Different aliases of the same page were in different requests
+                            _merge_separate(pages[key], page)
+                        else:
+                            pages[key] = page
+                except ApiPagesModifiedError as err:
+                    modified.extend(err.data)
+
+        for query in group.queries:
+            query.pages = []
+            found = set()
+            for value in query.ids:
+                page = pages.get(_resolve(value, aliases))
+                if page is not None and id(page) not in found:
+                    found.add(id(page))
+                    query.pages.append(page)
+        return modified
+
+
+def _split_group(group):
+    """
+    Split the ids of a group so that each page only gets the props and params
+    of the queries that requested it.
+    :return: list of [props, params, ids]
+    """
+    id_sets = [set(query.ids) for query in group.queries]
+    requests = []
+    for value in dict.fromkeys(v for query in group.queries for v in query.ids):
+        props = []
+        params = {}
+        for query, ids in zip(group.queries, id_sets):
+            if value in ids:
+                props.extend(p for p in query.props if p not in props)
+                params.update(query.params)
+        for request in requests:
+            if request[0] == props and request[1] == params:
+                request[2].append(value)
+                break
+        else:
+            requests.append([props, params, [value]])
+    return requests
+
+
+def _merge_separate(a, b):
+    """
+    Merge two page objects returned by separate API calls. Unlike the continuation
+    results merged by Site._merge_page(), lists of both calls are complete,
+    so they replace each other rather than being concatenated.
+    """
+    for k, val in b.items():
+        if isinstance(val, dict) and isinstance(a.get(k), dict):
+            _merge_separate(a[k], val)
+        else:
+            a[k] = val
+
+
+def _collect_aliases(results, aliases):
+    """Pass through the query results, recording all title normalizations and redirects"""
+    for result in results:
+        for name in ('normalized', 'converted', 'redirects'):
+            for item in result.get(name, ()):
+                aliases[item['from']] = item['to']
+        yield result
+
+
+def _resolve(title, aliases):
+    seen = set()
+    while title in aliases and title not in seen:
+        seen.add(title)
+        title = aliases[title]
+    return title
@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import deque
+
+
+class RequestHedger:
+    """
+    Reduces tail latency of the idempotent GET requests made by the Site object.
+    If a response has not arrived within the observed latency quantile (p95 by
+    default), a duplicate request is sent on another connection, and whichever
+    response arrives first is used. The other one is discarded. The number of
+    duplicate requests is limited by the budget, and by the free slots of the
+    Site's scheduler, if any. Requests run in a small pool of reusable daemon
+    threads, so discarded requests do not delay the process exit.
+
+        site = Site(url, hedger=RequestHedger())
+
+    * quantile: latency quantile to wait for before sending a duplicate request
+    * budget: maximum ratio of duplicate requests to all requests
+    * min_samples: number of requests to observe before hedging
+    * min_delay: minimum nb of seconds to wait before sending a duplicate request
+    * max_threads: maximum number of concurrent requests run by the worker threads,
+      the requests above it are made without hedging
+    """
+
+    def __init__(self, quantile=0.95, budget=0.05, min_samples=20, window=1000,
+                 min_delay=0.05, max_threads=8):
+        """
+        :param int window: number of the most recent latencies to track
+        """
+        self.quantile = quantile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_threads = max_threads
+        self._tasks = None
+        self._workers = 0
+        self._running = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    def delay(self):
+        """
+        :return: nb of seconds to wait before sending a duplicate request,
+            or None if not enough requests have been observed yet
+        """
+        with self._lock:
+            if len(self._latencies) < max(1, self.min_samples):
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * self.quantile))
+        return max(self.min_delay, latencies[index])
+
+    def run(self, func, scheduler=None, priority=None):
+        """
+        Call func(), and if it is slow, call it again in parallel.
+        :param func: a function without parameters, making an idempotent request
+        :param RequestScheduler scheduler: if given, a duplicate request is only sent
+            if the scheduler has a free slot. The caller must hold a slot while calling,
+            and the extra slot is held until both requests have completed, so that
+            the discarded request still counts towards the scheduler's slots
+        :param str priority: scheduler priority of the duplicate request
+        :return: result of whichever call completes first
+        """
+        # concurrent.futures is slow to import, and is not needed until the first request
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        start = time.monotonic()
+        delay = self.delay()
+        with self._lock:
+            self.requests += 1
+        primary = self._submit(func) if delay is not None else None
+        if primary is None:
+            # Not enough samples yet, or all worker threads are busy
+            result = func()
+            self._record(start)
+            return result
+
+        # Track the latency of the primary request even if the duplicate wins,
+        # otherwise hedging would keep lowering the delay
+        primary.add_done_callback(
+            lambda f: f.exception() is None and self._record(start))
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+        hedge = self._hedge(func, primary, scheduler, priority)
+        if hedge is None:
+            return primary.result()
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        first = done.pop()
+        if first.exception() is not None:
+            # Fall back to the other request if the first one has failed
+            other = hedge if first is primary else primary
+            if other.exception() is None:
+                first = other
+        if first is hedge and first.exception() is None:
+            with self._lock:
+                self.hedges_won += 1
+        return first.result()
+
+    def _hedge(self, func, primary, scheduler, priority):
+        """Start a duplicate request if allowed by the budget, threads, and scheduler"""
+        with self._lock:
+            if self.hedges >= self.budget * self.requests:
+                return None
+            self.hedges += 1
+        hedge = None
+        if scheduler is None:
+            hedge = self._submit(func)
+        elif scheduler.try_acquire(priority):
+            hedge = self._submit(func)
+            if hedge is None:
+                scheduler.release()
+            else:
+                # The caller's slot is released as soon as run() returns, even if
+                # the losing request is still running, so release this one last
+                running = [primary, hedge]
+
+                def release(future):
+                    with self._lock:
+                        running.remove(future)
+                        if running:
+                            return
+                    scheduler.release()
+
+                primary.add_done_callback(release)
+                hedge.add_done_callback(release)
+        if hedge is None:
+            with self._lock:
+                self.hedges -= 1
+        return hedge
+
+    def _submit(self, func):
+        """Run func() in a worker thread, or return None if all of them are busy"""
+        from concurrent.futures import Future
+        with self._lock:
+            if self._running >= self.max_threads:
+                return None
+            self._running += 1
+            if self._tasks is None:
+                from queue import SimpleQueue
+                self._tasks = SimpleQueue()
+            if self._running > self._workers:
+                # Daemon threads, unlike ThreadPoolExecutor ones, do not delay
+                # the interpreter exit until the discarded requests complete
+                self._workers += 1
+                threading.Thread(target=self._work, daemon=True,
+                                 name=f'RequestHedger-{self._workers}').start()
+        future = Future()
+        future.add_done_callback(self._finished)
+        self._tasks.put((future, func))
+        return future
+
+    def _work(self):
+        while True:
+            future, func = self._tasks.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func())
+            except BaseException as err:
+                future.set_exception(err)
+
+    def _finished(self, future):
+        with self._lock:
+            self._running -= 1
+
+    def _record(self, start):
+        with self._lock:
+            self._latencies.append(time.monotonic() - start)
+
+    def metrics(self):
+        """
+        Number of requests, duplicate requests, and how many of those responded
+        first, plus the current hedging delay in seconds
+        :rtype dict
+        """
+        delay = self.delay()
+        with self._lock:
+            return dict(requests=self.requests, hedges=self.hedges,
+                        hedges_won=self.hedges_won, delay=delay)
+
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class RequestScheduler:
+    """
+    Limits the number of concurrent requests made by one or more Site objects,
+    sharing the connection slots between priority classes in proportion to their
+    weights (weighted fair queuing). Waiting requests of the same priority are served
+    in order. Use with the Site object and its PRIORITY magic parameter:
+
+        site = Site(url, scheduler=RequestScheduler(slots=4))
+        site('query', meta='siteinfo', PRIORITY='high')
+
+    * slots: maximum number of concurrent requests
+    * weights: dict of priority name -> relative share of the slots
+    * default_priority: priority of the requests without the PRIORITY parameter
+    """
+
+    def __init__(self, slots=4, weights=None, default_priority='normal'):
+        if slots < 1:
+            raise ValueError('slots must be a positive number')
+        self.slots = slots
+        self.weights = weights if weights is not None else \
+            {'high': 8, 'normal': 4, 'low': 1}
+        if default_priority not in self.weights:
+            raise ValueError(f'Unknown default priority {default_priority}')
+        self.default_priority = default_priority
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queues = {p: deque() for p in self.weights}
+        # Virtual finish time of the first request of each priority queue,
+        # the lowest one goes next. Each request advances it by 1/weight.
+        self._finish = {p: 0.0 for p in self.weights}
+        self._vtime = 0.0
+        self._stats = {p: dict(requests=0, wait_total=0.0, wait_max=0.0)
+                       for p in self.weights}
+
+    @contextmanager
+    def slot(self, priority=None):
+        """
+        Wait for a free connection slot, and hold it until the end of the with block
+        :param str priority: one of the weights keys, or None for the default one
+        """
+        if priority is None:
+            priority = self.default_priority
+        elif priority not in self.weights:
+            raise ValueError(f'Unknown priority {priority}')
+        start = time.monotonic()
+        ticket = object()
+        with self._cond:
+            queue = self._queues[priority]
+            if not queue:
+                # Idle priorities should not accumulate credit
+                self._finish[priority] = max(self._finish[priority], self._vtime) + \
+                                         1 / self.weights[priority]
+            queue.append(ticket)
+            try:
+                while not (self._active < self.slots and queue[0] is ticket and
+                           self._next_priority() == priority):
+                    self._cond.wait()
+            except BaseException:
+                # e.g. KeyboardInterrupt - do not block the other waiters forever
+                self._cancel(priority, ticket)
+                raise
+            queue.popleft()
+            self._active += 1
+            self._vtime = self._finish[priority]
+            if queue:
+                self._finish[priority] += 1 / self.weights[priority]
+            wait = time.monotonic() - start
+            stats = self._stats[priority]
+            stats['requests'] += 1
+            stats['wait_total'] += wait
+            stats['wait_max'] = max(stats['wait_max'], wait)
+            # Other waiters might be able to proceed as well
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def try_acquire(self, priority=None):
+        """
+        Take a free slot without waiting, if no other requests are queued,
+        e.g. for optional requests. The slot must be returned with release().
+        :param str priority: one of the weights keys, or None for the default one
+        :return: True if the slot was taken
+        :rtype bool
+        """
+        if priority is None:
+            priority = self.default_priority
+        elif priority not in self.weights:
+            raise ValueError(f'Unknown priority {priority}')
+        with self._cond:
+            if self._active >= self.slots or any(self._queues.values()):
+                return False
+            self._active += 1
+            self._finish[priority] = max(self._finish[priority], self._vtime) + \
+                                     1 / self.weights[priority]
+            self._vtime = self._finish[priority]
+            self._stats[priority]['requests'] += 1
+            return True
+
+    def release(self):
+        """Return a slot taken by try_acquire()"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _cancel(self, priority, ticket):
+        queue = self._queues[priority]
+        if queue[0] is ticket:
+            queue.popleft()
+            if not queue:
+                # The next request of this priority inherits the finish time otherwise
+                self._finish[priority] -= 1 / self.weights[priority]
+        else:
+            queue.remove(ticket)
+        self._cond.notify_all()
+
+    def _next_priority(self):
+        return min((p for p, q in self._queues.items() if q), key=self._finish.get)
+
+    def metrics(self):
+        """
+        Queue wait statistics per priority: number of requests, total, max
+        and average wait time in seconds, and the number of currently queued requests
+        :rtype dict
+        """
+        with self._cond:
+            return {p: dict(stats,
+                            wait_avg=stats['wait_total'] / stats['requests']
+                            if stats['requests'] else 0.0,
+                            queued=len(self._queues[p]))
+                    for p, stats in self._stats.items()}
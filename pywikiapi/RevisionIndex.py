@@ -0,0 +1,179 @@
+from .utils import ApiPagesModifiedError
+
+
+class RevisionIndex:
+    """
+    A local sqlite index of pageid -> (lastrevid, touched) of the crawled pages,
+    used by the crawl() to only fetch the pages changed since the previous crawl.
+
+        index = RevisionIndex('enwiki.sqlite')
+        for page in index.crawl(site, dict(generator='allpages', gaplimit='max'),
+                                prop='revisions', rvprop='content', rvslots='main'):
+            ...
+    """
+
+    def __init__(self, path=':memory:'):
+        """
+        :param str path: sqlite database file name, or ':memory:' for a temporary index
+        """
+        # sqlite3 is relatively slow to import, and is rarely needed
+        import sqlite3
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS pages ('
+                        'pageid INTEGER PRIMARY KEY, lastrevid INTEGER, touched TEXT)')
+
+    def get(self, pageid):
+        """
+        :return: (lastrevid, touched) tuple, or None if the page is not in the index
+        """
+        return self.db.execute('SELECT lastrevid, touched FROM pages WHERE pageid = ?',
+                               (pageid,)).fetchone()
+
+    def changed(self, pages, use_touched=False):
+        """
+        Find all pages whose lastrevid (and optionally touched) differ from the index,
+        including the pages not yet in the index.
+        :param list pages: page objects with pageid, lastrevid, and touched (prop=info)
+        :param bool use_touched: also treat pages with a new touched value as changed,
+            e.g. re-rendered because of a template change
+        :rtype list
+        """
+        known = {}
+        ids = [p['pageid'] for p in pages]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            known.update((r[0], r[1:]) for r in self.db.execute(
+                'SELECT pageid, lastrevid, touched FROM pages WHERE pageid IN '
+                f'({",".join("?" * len(chunk))})', chunk))
+        result = []
+        for page in pages:
+            old = known.get(page['pageid'])
+            if old is None or old[0] != page.get('lastrevid') or \
+                    (use_touched and old[1] != page.get('touched')):
+                result.append(page)
+        return result
+
+    def update(self, pages):
+        """
+        Record the lastrevid and touched values of the given pages
+        :param pages: iterable of page objects with pageid, lastrevid, and touched
+        """
+        self.db.executemany(
+            'INSERT OR REPLACE INTO pages (pageid, lastrevid, touched) VALUES (?, ?, ?)',
+            ((p['pageid'], p.get('lastrevid'), p.get('touched')) for p in pages))
+        self.db.commit()
+
+    def delete(self, pageids):
+        """
+        Remove the given pages from the index, e.g. deleted pages
+        :param pageids: iterable of page ids
+        """
+        self.db.executemany('DELETE FROM pages WHERE pageid = ?', ((v,) for v in pageids))
+        self.db.commit()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def crawl(self, site, scan, batch_size=50, scan_batch_size=500,
+              use_touched=False, prune=False, **kwargs):
+        """
+        Two phase incremental crawl. First, enumerate pages with a cheap prop=info
+        query, and compare them with the index. Then, fetch the changed pages with
+        the given kwargs, yield them, and update the index. Each page is recorded
+        once the caller requests the next one, so if the iteration is interrupted,
+        unprocessed pages will be fetched again by the next crawl. Pages deleted
+        after the scan are yielded as missing, and removed from the index.
+        Pages deleted before the scan are only removed with prune=True.
+        If any of the pages change during the fetching, ApiPagesModifiedError(list)
+        will be thrown after all other pages have been processed and yielded.
+        :param Site site: the site to crawl
+        :param dict scan: query parameters to enumerate the pages, e.g.
+            dict(generator='allpages', gaplimit='max'). prop=info is added.
+        :param int batch_size: number of changed pages to fetch per request
+        :param int scan_batch_size: number of scanned pages to check at once
+        :param bool use_touched: see changed()
+        :param bool prune: once the crawl is complete, remove all pages not listed
+            by the scan from the index. Only use it if the scan lists all pages
+            that were ever added to this index, e.g. allpages of the crawled namespace
+        :param kwargs: query parameters to fetch the changed pages,
+            e.g. prop='revisions', rvprop='content'
+        """
+        scan = dict(scan)
+        prop = scan.get('prop') or []
+        prop = prop.split('|') if isinstance(prop, str) else list(prop)
+        if 'info' not in prop:
+            prop.append('info')
+        scan['prop'] = prop
+
+        if prune:
+            self.db.execute('CREATE TEMP TABLE IF NOT EXISTS scanned '
+                            '(pageid INTEGER PRIMARY KEY)')
+            self.db.execute('DELETE FROM temp.scanned')
+
+        modified = []
+        scanned = []
+        pending = []
+        try:
+            for page in site.query_pages(**scan):
+                if 'pageid' not in page:
+                    continue  # missing or invalid
+                scanned.append(page)
+                if len(scanned) >= scan_batch_size:
+                    pending.extend(self._check(scanned, use_touched, prune))
+                    scanned = []
+                while len(pending) >= batch_size:
+                    yield from self._fetch(site, pending[:batch_size], modified, kwargs)
+                    pending = pending[batch_size:]
+        except ApiPagesModifiedError as err:
+            # The rest of the scan is complete, modified pages will be re-scanned
+            # by the next crawl
+            modified.extend(err.data)
+            if prune:
+                self._add_scanned(err.data)
+        pending.extend(self._check(scanned, use_touched, prune))
+        for start in range(0, len(pending), batch_size):
+            yield from self._fetch(site, pending[start:start + batch_size], modified, kwargs)
+
+        if prune:
+            self.db.execute('DELETE FROM pages WHERE pageid NOT IN '
+                            '(SELECT pageid FROM temp.scanned)')
+            self.db.execute('DELETE FROM temp.scanned')
+            self.db.commit()
+        if modified:
+            raise ApiPagesModifiedError(modified)
+
+    def _check(self, scanned, use_touched, prune):
+        if prune:
+            self._add_scanned(p['pageid'] for p in scanned)
+        return self.changed(scanned, use_touched)
+
+    def _add_scanned(self, pageids):
+        self.db.executemany('INSERT OR IGNORE INTO temp.scanned (pageid) VALUES (?)',
+                            ((v,) for v in pageids))
+
+    def _fetch(self, site, scanned, modified, kwargs):
+        scanned = {p['pageid']: p for p in scanned}
+        done = []
+        deleted = []
+        try:
+            for page in site.query_pages(pageids=list(scanned), **kwargs):
+                yield page
+                if 'pageid' not in page:
+                    continue
+                if 'missing' in page:
+                    # Deleted since the scan, do not keep fetching it on every crawl
+                    deleted.append(page['pageid'])
+                    continue
+                # Fetched values are newer, but might not include prop=info
+                info = scanned.get(page['pageid'], {})
+                done.append(dict(pageid=page['pageid'],
+                                 lastrevid=page.get('lastrevid', info.get('lastrevid')),
+                                 touched=page.get('touched', info.get('touched'))))
+        except ApiPagesModifiedError as err:
+            modified.extend(err.data)
+        finally:
+            self.update(done)
+            self.delete(deleted)
@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows - logins will not be coordinated between processes
+    fcntl = None
+
+# Cookie constructor parameters, in order
+COOKIE_FIELDS = ['version', 'name', 'value', 'port', 'port_specified', 'domain',
+                 'domain_specified', 'domain_initial_dot', 'path', 'path_specified',
+                 'secure', 'expires', 'discard', 'comment', 'comment_url', 'rest',
+                 'rfc2109']
+
+
+class SessionStore:
+    """
+    Saves cookies and tokens of the logged in Site objects into a directory,
+    one file per (url, user), so that new processes can skip the login requests:
+
+        site = Site(url, session_store=SessionStore('~/.cache/pywikiapi'))
+        site.login(user, password)  # no requests if already saved by another process
+
+    Files are replaced atomically, and logins are serialized with a file lock,
+    so the store can be shared by multiple processes. Stored files contain
+    session cookies, and are only readable by the current user.
+    """
+
+    def __init__(self, path):
+        """
+        :param str path: directory to keep the session files in
+        """
+        self.path = Path(path).expanduser()
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, url, user):
+        import hashlib  # Not imported at the top to keep the package import fast
+        return self.path / (hashlib.sha1(f'{url}\n{user}'.encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, url, user):
+        """
+        :return: session state as saved by save(), or None if not saved
+        :rtype dict
+        """
+        try:
+            with open(self._file(url, user), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Treat a corrupted file as missing, it will be overwritten on login
+            return None
+
+    def save(self, url, user, state):
+        """
+        Atomically save the session state
+        :param dict state: json-serializable dict with 'cookies' and 'tokens'
+        """
+        file = self._file(url, user)
+        fd, tmp = tempfile.mkstemp(dir=str(self.path), suffix='.tmp')
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp, str(file))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def delete(self, url, user):
+        try:
+            self._file(url, user).unlink()
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self, url, user):
+        """
+        Hold an exclusive lock for the given (url, user) while in the with block.
+        Used to make sure only one process at a time logs in.
+        """
+        with open(str(self._file(url, user)) + '.lock', 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def dump_cookies(jar):
+    """
+    Convert all cookies of a cookie jar into a json-serializable list
+    :param http.cookiejar.CookieJar jar: e.g. requests.Session().cookies
+    :rtype list
+    """
+    return [{k: getattr(c, '_rest' if k == 'rest' else k) for k in COOKIE_FIELDS}
+            for c in jar]
+
+
+def load_cookies(jar, cookies):
+    """
+    Add cookies created by dump_cookies() to a cookie jar
+    :param http.cookiejar.CookieJar jar: e.g. requests.Session().cookies
+    :param list cookies: list of dicts
+    """
+    # http.cookiejar is slow to import, and is not needed until the login
+    from http.cookiejar import Cookie
+    for c in cookies:
+        jar.set_cookie(Cookie(**c))
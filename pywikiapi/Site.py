@@ -4,13 +4,11 @@ import sys
 import time
 import urllib.parse as urlparse
 from datetime import datetime
-from pathlib import Path
+from itertools import islice
 from typing import Union, Tuple
 
-import requests
-from requests.structures import CaseInsensitiveDict
-
-from .utils import ApiError, ApiPagesModifiedError
+from .SessionStore import dump_cookies, load_cookies
+from .utils import ApiError, ApiPagesModifiedError, CaseInsensitiveDict, RELOGIN_ERRORS
 
 
 class Site:
@@ -18,13 +16,13 @@ class Site:
     This object represents a MediaWiki API endpoint,
     e.g. https://en.wikipedia.org/w/api.php
     * url: Full url to site's api.php
-    * session: current request.session object
+    * session: current request.session object, created on first use
     * log: an object that will be used for logging. ConsoleLog is created by default
     """
 
     def __init__(self, url, headers=None, session=None, logger=None,
                  json_object_hook=None, retry_after_conn=5, pre_request_delay=0, 
-                 requests_timeout=60):
+                 requests_timeout=60, scheduler=None, session_store=None, hedger=None):
         """
         Create a new Site object with a given MediaWiki API endpoint.
         You should always set a `User-Agent` header to identify your bot and allow
@@ -33,7 +31,8 @@ class Site:
         :param str url: API endpoint URL, e.g. https://en.wikipedia.org/w/api.php
         :param Union[dict, CaseInsensitiveDict] headers: Optional headers as a dict.
         :param requests.Session session: Allows user-supplied custom Session
-            parameters, e.g. retries.
+            parameters, e.g. retries. Use pywikiapi.transport.UrllibSession() to avoid
+            loading the requests library.
         :param logging.Logger logger: Optional logger object for custom log output
         :param object json_object_hook: use this param to set a custom json object
             creator, e.g. pywikiapi.AttrDict. AttrDict allows direct property access
@@ -43,6 +42,12 @@ class Site:
             after a ConnectionError
         :param pre_request_delay: nb of seconds to wait before sending a request
             to the API
+        :param RequestScheduler scheduler: Optional scheduler to limit the number
+            of concurrent requests, sharing them between priority classes
+        :param SessionStore session_store: Optional persistent store of the login
+            sessions and tokens, shared between processes
+        :param RequestHedger hedger: Optional hedging of slow GET requests
+            with duplicate requests to reduce tail latency
         """
         if logger is None:
             self.logger = logging.getLogger('pywikiapi')
@@ -51,7 +56,7 @@ class Site:
             self.logger = logger
 
         self.json_object_hook = json_object_hook
-        self.session = session if session else requests.Session()
+        self._session = session
         self.url = url
         self.tokens = {}
         self.no_ssl = False  # For non-ssl sites, might be needed to avoid HTTPS
@@ -78,21 +83,41 @@ class Site:
         # None - don't timeout
         self.requests_timeout = requests_timeout
 
+        # Limits concurrent requests by their PRIORITY param
+        # None - no limits
+        self.scheduler = scheduler
+
+        # Sends a duplicate GET request if the response is slow
+        # None - no hedging
+        self.hedger = hedger
+
         # This var will contain (username,password) after the .login()
         # in case of the login-on-demand mode
         self._loginOnDemand = False  # type: Union[Tuple[str, str], bool]
         self.logged_in = False
 
+        # If set, login sessions are saved to and restored from this store,
+        # and expired sessions will login again using the saved (user,password)
+        self.session_store = session_store
+        self._credentials = None  # type: Union[Tuple[str, str], None]
+        self._session_state = None
+
+        # User-Agent, unless given, is set by the first request
         self.headers = CaseInsensitiveDict()
         if headers:
             self.headers.update(headers)
-        if u'User-Agent' not in self.headers:
-            try:
-                script = Path(sys.modules['__main__'].__file__)
-            except (KeyError, AttributeError):
-                script = Path(sys.executable)
-            self.headers[u'User-Agent'] = \
-                f'{script.parent.parent.name}-{script.name} pywikiapi/5.0.0'
+
+    @property
+    def session(self):
+        # Importing requests is relatively slow, so only do it when needed
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    @session.setter
+    def session(self, value):
+        self._session = value
 
     def __call__(self, action, **kwargs):
         """
@@ -114,13 +139,29 @@ class Site:
             :param EXTRAS: Any extra parameters as passed to requests
                 session.request(). Value is a dict()
             :param NO_LOGIN: do not attempt to do a login step if True
+            :param NO_RELOGIN: do not login again if the session from the
+                session_store has expired
+            :param PRIORITY: priority class of this request if the scheduler is set,
+                e.g. 'high' or 'low'. Retry delays do not hold a scheduler slot.
         """
+        priority = kwargs.pop('PRIORITY', None)
         if self._loginOnDemand and action != 'login' and (
             'NO_LOGIN' not in kwargs
             or not kwargs['NO_LOGIN']
         ):
             self.login(self._loginOnDemand[0], self._loginOnDemand[1])
 
+        # Sessions from the session store may expire at any time,
+        # so make sure the server checks it, and login again if needed
+        retry_kwargs = None
+        if self._credentials and self.logged_in and action != 'login' and \
+                not kwargs.get('NO_LOGIN') and not kwargs.pop('NO_RELOGIN', False):
+            if 'assert' not in kwargs:
+                kwargs['assert'] = 'user'
+            retry_kwargs = dict(kwargs, NO_RELOGIN=True)
+            if priority is not None:
+                retry_kwargs['PRIORITY'] = priority
+
         method, request_kw = self._prepare_call(action, kwargs)
 
         try_count = 0
@@ -132,8 +173,14 @@ class Site:
             if self.pre_request_delay:
                 time.sleep(self.pre_request_delay)
             try:
-                response = self.request(method, timeout=self.requests_timeout, **request_kw)
-            except requests.exceptions.ConnectionError as exc:
+                if self.scheduler is not None:
+                    with self.scheduler.slot(priority):
+                        response = self.request(method, timeout=self.requests_timeout,
+                                                priority=priority, **request_kw)
+                else:
+                    response = self.request(method, timeout=self.requests_timeout,
+                                            **request_kw)
+            except _connection_errors() as exc:
                 no_retry_conn = 0 <= self.retry_on_connection_error < try_count_conn
                 if self.logger.isEnabledFor(
                         logging.WARNING if no_retry_conn else logging.INFO):
@@ -178,6 +225,16 @@ class Site:
 
         # Handle success and failure
         if 'error' in data:
+            if retry_kwargs is not None and data['error'].get('code') in RELOGIN_ERRORS:
+                self.logger.info(f'Session has expired, logging in again, API={self.url}',
+                                 dict(code='relogin'))
+                old_tokens = self.tokens
+                self._login_with_store(*self._credentials, stale=self._session_state)
+                # Replace the expired token, if any, with the new one
+                for token_type, value in old_tokens.items():
+                    if retry_kwargs.get('token') == value:
+                        retry_kwargs['token'] = self.token(token_type)
+                return self(action, **retry_kwargs)
             raise ApiError('Server API Error', data['error'])
         if 'warnings' in data and self.logger.isEnabledFor(logging.WARNING):
             message = '\n'.join((
@@ -202,7 +259,7 @@ class Site:
             not self.no_ssl and \
             (action == 'login' or 'SSL' in kwargs or 'HTTPS' in kwargs)
         # Clean up magic CAPS params as they shouldn't be passed to the server
-        for k in ['POST', 'SSL', 'HTTPS', 'EXTRAS', 'NO_LOGIN']:
+        for k in ['POST', 'SSL', 'HTTPS', 'EXTRAS', 'NO_LOGIN', 'NO_RELOGIN', 'PRIORITY']:
             if k in kwargs:
                 del kwargs[k]
 
@@ -263,17 +320,65 @@ class Site:
         :param str user: user login name
         :param str password: user password
         :param bool on_demand: postpone login until an actual API request is made
+        If the session_store is set, a saved session is used instead if available.
         """
         self.tokens = {}
         if on_demand:
             self._loginOnDemand = (user, password)
             return
+        if self.session_store is not None:
+            self._credentials = (user, password)
+            self._login_with_store(user, password)
+            return
+        self._login(user, password)
+
+    def _login(self, user, password):
+        self.logged_in = False
         res = self('login', lgname=user, lgpassword=password,
                    lgtoken=self.token('login'))['login']
         if res['result'] != 'Success':
             raise ApiError('Login failed', res)
         self._loginOnDemand = False
         self.logged_in = True
+        if self.session_store is not None:
+            self._save_session()
+
+    def _login_with_store(self, user, password, stale=None):
+        """
+        Use the session from the session_store, or login and save it.
+        Only one process at a time will login, the others will reuse its session.
+        :param dict stale: the session state known to be expired
+        """
+        self.tokens = {}
+        with self.session_store.lock(self.url, user):
+            state = self.session_store.load(self.url, user)
+            if state is None or (stale is not None and
+                                 state['cookies'] == stale['cookies']):
+                self._login(user, password)
+                return
+        load_cookies(self.session.cookies, state['cookies'])
+        self.tokens.update(state['tokens'])
+        self._session_state = state
+        self._loginOnDemand = False
+        self.logged_in = True
+
+    def _save_tokens(self):
+        """
+        Add new tokens to the stored session, unless another process has replaced it
+        with a new session in the meantime, which must not be overwritten by this one
+        """
+        user = self._credentials[0]
+        with self.session_store.lock(self.url, user):
+            state = self.session_store.load(self.url, user)
+            if state is not None and self._session_state is not None and \
+                    state['cookies'] == self._session_state['cookies']:
+                self._save_session()
+
+    def _save_session(self):
+        state = dict(cookies=dump_cookies(self.session.cookies),
+                     tokens={k: v for k, v in self.tokens.items() if k != 'login'})
+        self.session_store.save(self.url, self._credentials[0], state)
+        self._session_state = state
 
     def is_bot(self) -> bool:
         """
@@ -333,22 +438,32 @@ class Site:
         If any of the pages change during iteration, ApiPagesModifiedError(list)
         will be thrown after all other pages have been processed and yielded.
         """
+        return self._query_pages(self.query(**kwargs))
+
+    def _query_pages(self, results):
+        """
+        Merge and yield page objects from the query results, see query_pages()
+        :param results: iterable of query results
+        """
         # A dict with incomplete page objects
         incomplete = {}
         # A set of page ids that we will ignore because
         # they have been modified during iteration
         modified = set()
         missing = set()
-        for result in self.query(**kwargs):
+        for result in results:
             if 'pages' not in result:
                 raise ApiError('Missing pages element in query result', result)
 
             new_incomplete = {}
             for page in result['pages']:
-                if 'missing' in page:
-                    if page['title'] not in missing:
+                if 'missing' in page or 'pageid' not in page:
+                    # Missing, invalid, and special pages are yielded as is.
+                    # Pages requested by pageids have no title if missing
+                    key = page.get('title', page.get('pageid'))
+                    if key not in missing:
                         yield page
-                        missing.add(page['title'])
+                        missing.add(key)
                     continue
                 page_id = page['pageid']
                 if page_id in modified:
@@ -381,6 +496,76 @@ class Site:
             # some pages have been modified between api calls, notify caller
             raise ApiPagesModifiedError(list(modified))
 
+    def query_page_contents(self, titles=None, pageids=None, batch_size=10,
+                            max_batch_size=50, target_size=6 * 2 ** 20, **kwargs):
+        """
+        Fetch the content of many pages, yielding each page object as soon as it
+        is complete. Pages are requested in batches, and the batch size is adjusted
+        based on the observed page sizes and the number of continuation rounds,
+        trying to get each batch in a single response without truncation.
+        By default, requests prop=revisions, rvprop=content, rvslots=main.
+        If any of the pages change during iteration, ApiPagesModifiedError(list)
+        will be thrown after all other pages have been processed and yielded.
+        :param titles: an iterable of page titles
+        :param pageids: an iterable of page ids, if titles is not given
+        :param int batch_size: number of pages in the first request
+        :param int max_batch_size: maximum number of pages per request
+        :param int target_size: desired content size of a single response,
+            should be below the server's $wgAPIMaxResultSize (8MB by default)
+        :param kwargs: any other query API parameters
+        """
+        if (titles is None) == (pageids is None):
+            raise ValueError('Either titles or pageids must be given')
+        key, values = ('titles', titles) if titles is not None else ('pageids', pageids)
+        if isinstance(values, (str, int)):
+            values = [values]
+        values = iter(values)
+        kwargs.setdefault('prop', 'revisions')
+        kwargs.setdefault('rvprop', 'content')
+        kwargs.setdefault('rvslots', 'main')
+
+        modified = []
+        while True:
+            batch = list(islice(values, batch_size))
+            if not batch:
+                break
+            stats = dict(rounds=0)
+            size = 0
+            try:
+                results = self.query(**{key: batch}, **kwargs)
+                for page in self._query_pages(_count_results(results, stats)):
+                    size += self._page_content_size(page)
+                    yield page
+            except ApiPagesModifiedError as err:
+                modified.extend(err.data)
+
+            rounds = stats['rounds']
+            if rounds > 1:
+                # Results were truncated, reduce proportionally
+                batch_size = max(1, len(batch) // rounds)
+            elif len(batch) == batch_size:
+                batch_size = min(max_batch_size, batch_size * 2)
+            if size:
+                batch_size = max(1, min(batch_size, target_size * len(batch) // size))
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f'Got {len(batch)} pages ({size:,} chars) in '
+                                  f'{rounds} requests, next batch size {batch_size}')
+
+        if modified:
+            raise ApiPagesModifiedError(modified)
+
+    @staticmethod
+    def _page_content_size(page):
+        """Approximate size of all revision contents of the page"""
+        size = 0
+        for rev in page.get('revisions', ()):
+            if 'slots' in rev:
+                for slot in rev['slots'].values():
+                    size += len(slot.get('content', ''))
+            else:
+                size += len(rev.get('content', ''))
+        return size
+
     def _merge_page(self, a, b):
         """
         Recursively merge two page objects
@@ -407,15 +592,23 @@ class Site:
             res = self.query(meta='tokens', type=token_type,
                              NO_LOGIN=token_type == 'login')
             self.tokens[token_type] = next(res)['tokens'][token_type + 'token']
+            if self._credentials and self.logged_in and token_type != 'login':
+                self._save_tokens()
         return self.tokens[token_type]
 
-    def request(self, method, timeout, force_ssl=False, headers=None, **request_kw):
-        """Make a low level request to the server"""
+    def request(self, method, timeout, force_ssl=False, headers=None, priority=None,
+                **request_kw):
+        """
+        Make a low level request to the server
+        :param str priority: scheduler priority for the duplicate requests of the hedger
+        """
         url = self.url
         if force_ssl:
             parts = list(urlparse.urlparse(url))
             parts[0] = 'https'
             url = urlparse.urlunparse(parts)
+        if u'User-Agent' not in self.headers:
+            self.headers[u'User-Agent'] = _default_user_agent()
         if headers:
             h = self.headers.copy()
             h.update(headers)
@@ -423,11 +616,17 @@ class Site:
         else:
             headers = self.headers
 
-        r = self.session.request(method, url, timeout=timeout, headers=headers, **request_kw)
+        if self.hedger is not None and method == 'GET':
+            r = self.hedger.run(lambda: self.session.request(
+                method, url, timeout=timeout, headers=headers, **request_kw),
+                scheduler=self.scheduler, priority=priority)
+        else:
+            r = self.session.request(method, url, timeout=timeout, headers=headers,
+                                     **request_kw)
         if not r.ok:
             try:
                 raise ApiError('Call failed', {"status_code": r.status_code, "json_body": r.json()})
-            except requests.exceptions.JSONDecodeError:
+            except ValueError:  # JSONDecodeError of any json library
                 raise ApiError('Call failed', {"status_code": r.status_code, "text_body": r.text}) from None
 
         if self.logger.isEnabledFor(logging.DEBUG):
@@ -459,3 +658,28 @@ class Site:
         if self.logged_in:
             res += ' (logged in)'
         return res
+
+
+def _connection_errors():
+    """Connection error types of all the transports that have been loaded"""
+    requests = sys.modules.get('requests')
+    if requests is None:
+        return ConnectionError,
+    return ConnectionError, requests.exceptions.ConnectionError
+
+
+def _default_user_agent():
+    """Dir name + script name of the running bot"""
+    from pathlib import Path
+    try:
+        script = Path(sys.modules['__main__'].__file__)
+    except (KeyError, AttributeError, TypeError):
+        script = Path(sys.executable)
+    return f'{script.parent.parent.name}-{script.name} pywikiapi/5.0.0'
+
+
+def _count_results(results, stats):
+    """Pass through the query results, counting them in stats['rounds']"""
+    for result in results:
+        stats['rounds'] += 1
+        yield result
@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+
+from .Site import Site
+from .utils import ApiError, RELOGIN_ERRORS
+
+
+class SitePool:
+    """
+    This object spreads write requests for a single MediaWiki API endpoint across
+    several accounts. Each account has its own Site object (session, cookies,
+    and token cache) and its own rate budget.
+    * sites: list of Site objects, one per account
+    * min_interval: minimum nb of seconds between two requests of the same account
+    """
+
+    def __init__(self, url, accounts, min_interval=0, logger=None, **kwargs):
+        """
+        Create a pool of Site objects, one per account. The accounts will login
+        on demand, i.e. when first used.
+        :param str url: API endpoint URL, e.g. https://en.wikipedia.org/w/api.php
+        :param list accounts: a list of (user, password) tuples
+        :param min_interval: minimum nb of seconds between two requests
+            made by the same account, e.g. 10 for 6 edits per minute
+        :param logging.Logger logger: Optional logger object for custom log output
+        :param kwargs: any other Site constructor parameters except the session
+        """
+        if not accounts:
+            raise ValueError('At least one account is required')
+        if 'session' in kwargs:
+            raise ValueError('Each account must have its own session')
+        self.logger = logger if logger is not None else logging.getLogger('pywikiapi')
+        self.min_interval = min_interval
+        self._accounts = list(accounts)
+        self.sites = [Site(url, logger=logger, **kwargs) for _ in self._accounts]
+        for site, (user, password) in zip(self.sites, self._accounts):
+            site.login(user, password, on_demand=True)
+        self._next_time = [0.0] * len(self.sites)
+        self._lock = threading.Lock()
+
+    def __call__(self, action, **kwargs):
+        """
+        Make an API call using the least recently used account, waiting until
+        its rate budget allows another request:
+
+            pool('edit', title='Test', text='...', TOKEN='csrf')
+
+        If the account's session has expired, the account will login again,
+        and the request will be retried once. By default, all calls are made
+        with assert=user to detect expired sessions.
+
+        Accepts all the magic CAPS parameters of the Site object, plus:
+        :param TOKEN: token type, e.g. 'csrf'. The token of the chosen account
+            will be passed as the "token" parameter.
+        """
+        token_type = kwargs.pop('TOKEN', None)
+        if 'assert' not in kwargs:
+            kwargs['assert'] = 'user'
+        index = self._acquire()
+        site = self.sites[index]
+        relogin = True
+        while True:
+            if token_type:
+                kwargs['token'] = site.token(token_type)
+            try:
+                return site(action, **kwargs)
+            except ApiError as err:
+                if not relogin or not isinstance(err.data, dict) or \
+                        err.data.get('code') not in RELOGIN_ERRORS:
+                    raise
+                self.logger.info(f'Session of {self._accounts[index][0]} has expired, '
+                                 f'logging in again', dict(code='relogin'))
+                relogin = False
+                site.login(*self._accounts[index])
+
+    def _acquire(self):
+        """
+        Choose the account that can make the next request the soonest,
+        and wait until then.
+        :return: index of the chosen site
+        """
+        with self._lock:
+            index = min(range(len(self.sites)), key=self._next_time.__getitem__)
+            now = time.monotonic()
+            start = max(now, self._next_time[index])
+            self._next_time[index] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+        return index
+
+    def __str__(self):
+        return f'{self.sites[0].url} ({len(self.sites)} accounts)'
@@ -9,5 +9,13 @@ __license__ = "MIT License"
 __email__ = "YuriAstrakhan@gmail.com"
 
 from .Site import Site
+from .SitePool import SitePool
+from .QueryPlanner import QueryPlanner, PlannedQuery
+from .RequestHedger import RequestHedger
+from .RequestScheduler import RequestScheduler
+from .RevisionIndex import RevisionIndex
+from .SessionStore import SessionStore
 from .api import wikipedia
-from .utils import ApiError, ApiPagesModifiedError, AttrDict, to_datetime, to_timestamp
+from .sinks import write_ndjson, write_arrow, write_parquet
+from .utils import ApiError, ApiPagesModifiedError, AttrDict, to_datetime, to_timestamp, \
+    to_epoch, to_epochs, to_datetime64, Timestamp, lazy_timestamps
@@ -0,0 +1,222 @@
+"""
+Streaming sinks for query results, e.g. site.query_pages(...) or page lists
+extracted from site.query(...). Records are written in chunks, so memory usage
+stays flat regardless of the total number of records.
+
+NDJSON has no extra dependencies. Arrow and Parquet sinks require pyarrow:
+    pip install pywikiapi[arrow]
+"""
+import json
+from itertools import islice
+
+
+def prop_fields(pa):
+    """
+    Well known page fields returned by the MW API per prop=... value, used to make
+    sure the schema has them even if they are absent from the first chunk,
+    e.g. 'redirect' or 'missing' flags. Other fields, including the nested ones,
+    are inferred from the data.
+    :param pa: pyarrow module
+    :rtype dict
+    """
+    s, i, b = pa.string(), pa.int64(), pa.bool_()
+    title = [('ns', i), ('title', s)]
+    content = [('contentmodel', s), ('contentformat', s), ('content', s),
+               ('size', i), ('sha1', s), ('texthidden', b)]
+    revision = [('revid', i), ('parentid', i), ('minor', b), ('user', s), ('userid', i),
+                ('anon', b), ('userhidden', b), ('timestamp', s), ('size', i), ('sha1', s),
+                ('sha1hidden', b), ('comment', s), ('commenthidden', b),
+                ('suppressed', b), ('tags', pa.list_(s)),
+                ('contentmodel', s), ('contentformat', s), ('content', s),
+                ('slots', pa.struct([('main', pa.struct(content))]))]
+    return {
+        None: [('pageid', i), ('ns', i), ('title', s), ('missing', b), ('invalid', b),
+               ('invalidreason', s)],
+        'info': [('contentmodel', s), ('pagelanguage', s), ('pagelanguagehtmlcode', s),
+                 ('pagelanguagedir', s), ('touched', s), ('lastrevid', i), ('length', i),
+                 ('redirect', b), ('new', b)],
+        'pageprops': [('pageprops', pa.map_(s, s))],
+        'categories': [('categories', pa.list_(pa.struct(
+            title + [('sortkey', s), ('sortkeyprefix', s), ('timestamp', s),
+                     ('hidden', b)])))],
+        'revisions': [('revisions', pa.list_(pa.struct(revision)))],
+        'links': [('links', pa.list_(pa.struct(title)))],
+        'templates': [('templates', pa.list_(pa.struct(title)))],
+        'images': [('images', pa.list_(pa.struct(title)))],
+        'langlinks': [('langlinks', pa.list_(pa.struct([('lang', s), ('title', s)])))],
+    }
+
+
+def _chunks(items, chunk_size):
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be a positive number')
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _open(file, mode):
+    """Returns (file object, should_close) for a path or a file-like object"""
+    if hasattr(file, 'write'):
+        return file, False
+    if 'b' in mode:
+        return open(file, mode), True
+    return open(file, mode, encoding='utf-8'), True
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as err:
+        raise ImportError('Arrow and Parquet sinks require pyarrow, '
+                          'use  pip install pywikiapi[arrow]') from err
+    return pyarrow
+
+
+def write_ndjson(items, file, chunk_size=1000):
+    """
+    Write each item (e.g. a page object) as a single JSON line.
+    :param items: any iterable of dicts, e.g. site.query_pages(...)
+    :param file: a file name or a text file-like object
+    :param int chunk_size: number of records to serialize per single write
+    :return: number of records written
+    :rtype int
+    """
+    f, should_close = _open(file, 'w')
+    count = 0
+    try:
+        for chunk in _chunks(items, chunk_size):
+            f.write(''.join(json.dumps(v, ensure_ascii=False) + '\n' for v in chunk))
+            count += len(chunk)
+    finally:
+        if should_close:
+            f.close()
+    return count
+
+
+def infer_schema(sample, prop=None):
+    """
+    Create a pyarrow schema from a list of sample records. Well known fields of the
+    requested props (see prop_fields()) are always added with their proper types.
+    Other fields are inferred from the sample, using string for all-null ones.
+    :param list sample: a list of dicts, e.g. the first chunk of pages
+    :param Union[str, list] prop: the same prop value as given to query_pages()
+    :rtype pyarrow.Schema
+    """
+    pa = _import_pyarrow()
+    if isinstance(prop, str):
+        prop = prop.split('|')
+    all_known = prop_fields(pa)
+    known = dict(f for p in [None] + list(prop or []) for f in all_known.get(p, []))
+    fields = []
+    for field in pa.Table.from_pylist(sample).schema:
+        type_ = _merge_types(pa, field.type, known.pop(field.name, None))
+        fields.append(pa.field(field.name, type_))
+    fields.extend(pa.field(name, type_) for name, type_ in known.items())
+    return pa.schema(fields)
+
+
+def _merge_types(pa, inferred, known):
+    """
+    Use the known type, adding any extra struct fields found in the inferred one.
+    Values that were null in the whole sample are inferred as strings.
+    """
+    if known is None:
+        if pa.types.is_null(inferred):
+            return pa.string()
+        known = inferred
+    if pa.types.is_struct(inferred) and pa.types.is_struct(known):
+        names = {f.name for f in known}
+        fields = [pa.field(f.name, _merge_types(
+            pa, inferred.field(f.name).type if inferred.get_field_index(f.name) >= 0
+            else f.type, f.type)) for f in known]
+        fields.extend(pa.field(f.name, _merge_types(pa, f.type, None))
+                      for f in inferred if f.name not in names)
+        return pa.struct(fields)
+    if pa.types.is_list(inferred) and pa.types.is_list(known):
+        return pa.list_(_merge_types(pa, inferred.value_type, known.value_type))
+    return known
+
+
+def _unknown_fields(pa, value, type_, path=''):
+    """Yields the dotted names of all fields of the value that are absent from the type"""
+    if isinstance(value, dict) and pa.types.is_struct(type_):
+        for name, item in value.items():
+            index = type_.get_field_index(name)
+            if index < 0:
+                yield path + name
+            else:
+                yield from _unknown_fields(pa, item, type_.field(index).type, f'{path}{name}.')
+    elif isinstance(value, list) and pa.types.is_list(type_):
+        for item in value:
+            yield from _unknown_fields(pa, item, type_.value_type, path)
+
+
+def _write_batches(items, chunk_size, schema, prop, open_writer):
+    pa = _import_pyarrow()
+    writer = None
+    count = 0
+    record_type = None
+    try:
+        for chunk in _chunks(items, chunk_size):
+            if record_type is None:
+                if schema is None:
+                    schema = infer_schema(chunk, prop)
+                # pyarrow silently drops the fields that are not in the schema
+                record_type = pa.struct(list(schema))
+            unknown = {name for record in chunk
+                       for name in _unknown_fields(pa, record, record_type)}
+            if unknown:
+                raise ValueError(f'Fields {", ".join(sorted(unknown))} are not in the schema, '
+                                 f'pass them via prop=... or an explicit schema')
+            table = pa.Table.from_pylist(chunk, schema=schema)
+            if writer is None:
+                writer = open_writer(schema)
+            writer.write_table(table)
+            count += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def write_arrow(items, file, chunk_size=10000, schema=None, prop=None):
+    """
+    Write items as a stream of Arrow record batches (Arrow IPC stream format).
+    Unless given, the schema is inferred from the first chunk, see infer_schema().
+    Missing fields are set to null. A record with a field that is not in the schema,
+    including the nested ones, e.g. revisions.tags, raises a ValueError,
+    as the schema cannot be changed after the first batch.
+    :param items: any iterable of dicts, e.g. site.query_pages(...)
+    :param file: a file name or a binary file-like object
+    :param int chunk_size: number of records per record batch
+    :param pyarrow.Schema schema: optional explicit schema
+    :param Union[str, list] prop: the same prop value as given to query_pages()
+    :return: number of records written
+    :rtype int
+    """
+    pa = _import_pyarrow()
+    f, should_close = _open(file, 'wb')
+    try:
+        return _write_batches(items, chunk_size, schema, prop,
+                              lambda s: pa.ipc.new_stream(f, s))
+    finally:
+        if should_close:
+            f.close()
+
+
+def write_parquet(items, file, chunk_size=10000, schema=None, prop=None, **kwargs):
+    """
+    Write items into a Parquet file, one row group per chunk.
+    See write_arrow() for the parameters. Any additional kwargs are passed
+    to the pyarrow.parquet.ParquetWriter, e.g. compression='zstd'
+    :return: number of records written
+    :rtype int
+    """
+    _import_pyarrow()
+    import pyarrow.parquet as pq
+    return _write_batches(items, chunk_size, schema, prop,
+                          lambda s: pq.ParquetWriter(file, s, **kwargs))
@@ -0,0 +1,81 @@
+"""
+A minimal stdlib-only HTTP transport, for short-lived jobs that want to avoid
+the cost of importing the requests library:
+
+    site = Site(url, session=UrllibSession())
+"""
+import json
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import build_opener, HTTPCookieProcessor, Request
+
+
+class UrllibRequest:
+    """The subset of requests.PreparedRequest used by the Site object"""
+
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+
+
+class UrllibResponse:
+    """The subset of requests.Response used by the Site object"""
+
+    def __init__(self, request, status_code, headers, content):
+        self.request = request
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self, **kwargs):
+        return json.loads(self.content, **kwargs)
+
+
+class UrllibSession:
+    """
+    A drop-in replacement for requests.Session based on urllib, supporting
+    only what the Site object needs: GET and POST requests with url-encoded
+    parameters, cookies, and timeouts. Connection failures are reported as
+    the built-in ConnectionError.
+    * cookies: http.cookiejar.CookieJar with all the session cookies
+    * headers: default headers sent with every request
+    """
+
+    def __init__(self):
+        self.cookies = CookieJar()
+        self.headers = {}
+        self._opener = build_opener(HTTPCookieProcessor(self.cookies))
+
+    def request(self, method, url, params=None, data=None, headers=None,
+                timeout=None, **kwargs):
+        if kwargs:
+            raise TypeError(f'UrllibSession does not support {", ".join(kwargs)}')
+        if params:
+            url += ('&' if '?' in url else '?') + urlencode(params)
+        if data is not None:
+            data = urlencode(data).encode('utf-8')
+        all_headers = dict(self.headers)
+        if headers:
+            all_headers.update(headers)
+        request = UrllibRequest(method, url)
+        try:
+            with self._opener.open(Request(url, data=data, headers=all_headers,
+                                           method=method), timeout=timeout) as resp:
+                return UrllibResponse(request, resp.status, resp.headers, resp.read())
+        except HTTPError as err:
+            with err:
+                return UrllibResponse(request, err.code, err.headers, err.read())
+        except URLError as err:
+            raise ConnectionError(f'Unable to connect to {url}: {err.reason}') from err
+
+    def close(self):
+        pass
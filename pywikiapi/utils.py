@@ -1,6 +1,12 @@
 import json
+import re
+from collections.abc import MutableMapping
 from datetime import datetime
 
+# Errors indicating that the session has expired and the user must login again
+RELOGIN_ERRORS = {'assertuserfailed', 'assertbotfailed', 'assertnameduserfailed',
+                  'badtoken', 'notloggedin'}
+
 
 class ApiError(Exception):
     """
@@ -22,7 +28,7 @@ class ApiPagesModifiedError(ApiError):
     """
 
     def __init__(self, data):
-        super(ApiError, self).__init__('Pages modified during iteration', data)
+        super().__init__('Pages modified during iteration', data)
 
 
 class AttrDict(dict):
@@ -37,6 +43,38 @@ class AttrDict(dict):
         self.__dict__ = self
 
 
+class CaseInsensitiveDict(MutableMapping):
+    """
+    A dict with case-insensitive string keys that preserves the original case
+    of the keys. Used for HTTP headers without importing the requests library.
+    """
+
+    def __init__(self, data=None, **kwargs):
+        self._store = {}
+        self.update(data or {}, **kwargs)
+
+    def __setitem__(self, key, value):
+        self._store[key.lower()] = (key, value)
+
+    def __getitem__(self, key):
+        return self._store[key.lower()][1]
+
+    def __delitem__(self, key):
+        del self._store[key.lower()]
+
+    def __iter__(self):
+        return (key for key, value in self._store.values())
+
+    def __len__(self):
+        return len(self._store)
+
+    def copy(self):
+        return CaseInsensitiveDict(self._store.values())
+
+    def __repr__(self):
+        return str(dict(self.items()))
+
+
 def to_timestamp(value):
     """
     Convert datetime to a timestamp string MediaWiki would understand.
@@ -51,6 +89,23 @@ def to_timestamp(value):
     return value.strftime('%Y-%m-%dT%H:%M:%SZ')
 
 
+# Matching this is several times faster than strptime(), and stricter:
+# only ASCII digits, and all fields must have a fixed width
+_MW_TIMESTAMP = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)Z', re.ASCII)
+# Same as above, but with the whole date in one group
+_MW_TIME = re.compile(r'(\d{4}-\d\d-\d\d)T(\d\d):(\d\d):(\d\d)Z', re.ASCII)
+_DAYS_IN_MONTH = [0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+
+def _parse_timestamp(timestamp):
+    """Split MediaWiki timestamp into 6 string fields, from year to second"""
+    match = _MW_TIMESTAMP.fullmatch(timestamp) if isinstance(timestamp, str) else None
+    if match is None:
+        raise ValueError(f"time data {timestamp!r} does not match format "
+                         f"'%Y-%m-%dT%H:%M:%SZ'")
+    return match.groups()
+
+
 def to_datetime(timestamp):
     """
     Convert MediaWiki timestamp to a datetime object.
@@ -58,4 +113,116 @@ def to_datetime(timestamp):
     :type timestamp: str
     :rtype datetime
     """
-    return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ')
+    year, month, day, hour, minute, second = _parse_timestamp(timestamp)
+    return datetime(int(year), int(month), int(day),
+                    int(hour), int(minute), int(second))
+
+
+def to_epoch(timestamp):
+    """
+    Convert MediaWiki timestamp to the number of seconds since 1970-01-01 UTC.
+    Computed directly from the timestamp fields without creating a datetime.
+    :type timestamp: str
+    :rtype int
+    """
+    year, month, day, hour, minute, second = map(int, _parse_timestamp(timestamp))
+    leap = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if not (1 <= month <= 12 and 1 <= day <= _DAYS_IN_MONTH[month] + leap and
+            hour < 24 and minute < 60 and second < 60 and year > 0):
+        raise ValueError(f'Invalid timestamp {timestamp!r}')
+    # Days from civil date, see http://howardhinnant.github.io/date_algorithms.html
+    if month <= 2:
+        year -= 1
+        month += 9
+    else:
+        month -= 3
+    era = year // 400
+    yoe = year - era * 400
+    days = era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + \
+        (153 * month + 2) // 5 + day - 1 - 719468
+    return days * 86400 + hour * 3600 + minute * 60 + second
+
+
+def to_epochs(timestamps):
+    """
+    Convert a list (or any iterable) of MediaWiki timestamps to a list of
+    epoch seconds, see to_epoch(). None values are kept as None.
+    The day number of each distinct date is only computed once.
+    For the fastest bulk conversion, use to_datetime64() with NumPy.
+    :rtype list
+    """
+    days = {}
+    result = []
+    for value in timestamps:
+        if value is None:
+            result.append(None)
+            continue
+        match = _MW_TIME.fullmatch(value) if isinstance(value, str) else None
+        if match is None:
+            result.append(to_epoch(value))  # raises the ValueError
+            continue
+        date, hour, minute, second = match.groups()
+        day = days.get(date)
+        if day is None:
+            day = days[date] = to_epoch(date + 'T00:00:00Z')
+        hour, minute, second = int(hour), int(minute), int(second)
+        if hour > 23 or minute > 59 or second > 59:
+            raise ValueError(f'Invalid timestamp {value!r}')
+        result.append(day + hour * 3600 + minute * 60 + second)
+    return result
+
+
+def to_datetime64(timestamps):
+    """
+    Convert a list (or any iterable) of MediaWiki timestamps to a NumPy
+    datetime64[s] array. None values become NaT. Requires numpy.
+    :rtype numpy.ndarray
+    """
+    import numpy as np
+    return np.array([None if v is None else v[:-1] if v[-1:] == 'Z' else v
+                     for v in timestamps], dtype='datetime64[s]')
+
+
+class Timestamp(str):
+    """
+    A MediaWiki timestamp string that is parsed only when its
+    datetime or epoch value is accessed. See lazy_timestamps()
+    """
+
+    @property
+    def datetime(self):
+        try:
+            return self._datetime
+        except AttributeError:
+            self._datetime = to_datetime(self)
+            return self._datetime
+
+    @property
+    def epoch(self):
+        return to_epoch(self)
+
+
+# Names of the result fields that contain timestamps, in addition to all *timestamp
+TIMESTAMP_FIELDS = {'touched', 'registration', 'expiry', 'until', 'start', 'end'}
+
+
+def lazy_timestamps(object_hook=None):
+    """
+    Create a json_object_hook for the Site object that wraps all timestamp values
+    in the results into Timestamp strings, allowing lazy parsing with .datetime
+
+        site = Site(url, json_object_hook=lazy_timestamps(AttrDict))
+        for page in site.query_pages(titles='Test', prop='info'):
+            print(page.touched.datetime)
+
+    :param object_hook: optional json object hook to chain, e.g. AttrDict
+    """
+
+    def hook(obj):
+        for k, v in obj.items():
+            if (isinstance(v, str) and _MW_TIMESTAMP.fullmatch(v) and
+                    (k in TIMESTAMP_FIELDS or k.endswith('timestamp'))):
+                obj[k] = Timestamp(v)
+        return object_hook(obj) if object_hook else obj
+
+    return hook
@@ -28,4 +28,7 @@ setup(
     ],
     include_package_data=True,
     install_requires=["requests", 'responses'],
+    extras_require={
+        'arrow': ['pyarrow'],
+    },
 )
@@ -0,0 +1,151 @@
+import itertools
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+import unittest
+
+import responses
+
+from pywikiapi import Site, RequestHedger, RequestScheduler
+
+
+class Tests_Hedger(unittest.TestCase):
+
+    def hedger(self, **kwargs):
+        hedger = RequestHedger(min_samples=5, min_delay=0.01, **kwargs)
+        for _ in range(5):
+            hedger.run(lambda: None)
+        return hedger
+
+    def slow_first(self, first_delay=1.0, first_error=None):
+        """Returns a function which is slow (or fails) on the first call only"""
+        counter = itertools.count()
+
+        def func():
+            call = next(counter)
+            if call == 0:
+                time.sleep(first_delay)
+                if first_error:
+                    raise first_error
+            return call
+
+        return func
+
+    def test_no_samples(self):
+        hedger = RequestHedger(min_samples=5)
+        self.assertIsNone(hedger.delay())
+        self.assertEqual(hedger.run(self.slow_first(0.05)), 0)
+        self.assertEqual(hedger.metrics()['hedges'], 0)
+
+    def test_hedge_wins(self):
+        hedger = self.hedger(budget=0.5)
+        self.assertEqual(hedger.delay(), 0.01)
+        self.assertEqual(hedger.run(self.slow_first()), 1)
+        self.assertEqual(hedger.metrics(), dict(requests=6, hedges=1, hedges_won=1,
+                                                delay=hedger.delay()))
+
+    def test_budget(self):
+        hedger = self.hedger(budget=0)
+        self.assertEqual(hedger.run(self.slow_first(0.05)), 0)
+        self.assertEqual(hedger.metrics()['hedges'], 0)
+
+    def test_failed_first(self):
+        hedger = self.hedger(budget=0.5)
+        self.assertEqual(hedger.run(self.slow_first(0.05, ValueError())), 1)
+        counter = itertools.count()
+
+        def always_fails():
+            time.sleep(0.05 if next(counter) == 0 else 0.1)
+            raise ValueError()
+
+        self.assertRaises(ValueError, lambda: hedger.run(always_fails))
+
+    def test_primary_latency(self):
+        hedger = self.hedger(budget=0.5)
+        self.assertEqual(hedger.run(self.slow_first(0.2)), 1)
+        deadline = time.monotonic() + 5
+        while len(hedger._latencies) < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The slow primary is recorded, not the fast duplicate
+        self.assertGreaterEqual(hedger._latencies[-1], 0.2)
+
+    def test_scheduler(self):
+        scheduler = RequestScheduler(slots=1)
+        hedger = self.hedger(budget=0.5)
+        with scheduler.slot():
+            self.assertEqual(hedger.run(self.slow_first(0.05), scheduler), 0)
+        self.assertEqual(hedger.metrics()['hedges'], 0)
+
+        scheduler = RequestScheduler(slots=2)
+        with scheduler.slot('low'):
+            self.assertEqual(hedger.run(self.slow_first(), scheduler, 'high'), 1)
+        self.assertEqual(hedger.metrics()['hedges'], 1)
+        self.assertEqual(scheduler.metrics()['high']['requests'], 1)
+        # held for the slow primary request
+        self.assertEqual(scheduler._active, 1)
+
+    def test_scheduler_discarded(self):
+        scheduler = RequestScheduler(slots=2)
+        hedger = self.hedger(budget=0.5)
+        release = threading.Event()
+        counter = itertools.count()
+
+        def func():
+            if next(counter) == 0:
+                release.wait(5)
+            return 1
+
+        with scheduler.slot():
+            self.assertEqual(hedger.run(func, scheduler), 1)
+        # The discarded primary request still holds a slot until it completes
+        self.assertEqual(scheduler._active, 1)
+        self.assertTrue(scheduler.try_acquire())
+        self.assertFalse(scheduler.try_acquire())
+        scheduler.release()
+        release.set()
+        deadline = time.monotonic() + 5
+        while scheduler._active and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(scheduler._active, 0)
+
+    def test_exit(self):
+        code = textwrap.dedent('''
+            import itertools, time
+            from pywikiapi import RequestHedger
+            hedger = RequestHedger(min_samples=1, min_delay=0.01, budget=1)
+            hedger.run(lambda: None)
+            counter = itertools.count()
+            hedger.run(lambda: time.sleep(10 if next(counter) == 0 else 0))
+        ''')
+        start = time.monotonic()
+        subprocess.run([sys.executable, '-c', code], check=True,
+                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        # The discarded request does not delay the exit
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_threads(self):
+        hedger = self.hedger(budget=0.5, max_threads=0)
+        self.assertEqual(hedger.run(self.slow_first(0.05)), 0)
+        self.assertEqual(hedger.metrics()['hedges'], 0)
+
+        hedger = self.hedger(max_threads=2)
+        for _ in range(10):
+            hedger.run(lambda: None)
+        self.assertLessEqual(hedger._workers, 2)
+
+    @responses.activate
+    def test_site(self):
+        api_url = 'http://example.org/api.php'
+        responses.add(responses.GET, api_url, json={})
+        responses.add(responses.POST, api_url, json={})
+        site = Site(api_url, hedger=RequestHedger())
+        site('query')
+        site('query', POST=1)
+        self.assertEqual(site.hedger.metrics()['requests'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,11 @@
+import json
 import unittest
 from typing import List
 from urllib.parse import urlparse, parse_qs
 
 import responses
 
-from pywikiapi import Site
+from pywikiapi import Site, ApiPagesModifiedError
 
 
 class Tests_QueryPages(unittest.TestCase):
@@ -90,6 +91,96 @@ class Tests_QueryPages(unittest.TestCase):
         self.assertEqual(next(pages, None), None)
         self.assertEqual(3, len(responses.calls))
 
+    @responses.activate
+    def test_query_page_contents_grow(self):
+        site = self.init_content_server(max_pages=100)
+        titles = [f'P{i}' for i in range(20)]
+        pages = list(site.query_page_contents(titles, batch_size=2, max_batch_size=8))
+        self.assertEqual([p['title'] for p in pages], titles)
+        self.assertEqual(self.batches, [2, 4, 8, 6])
+        self.assertEqual(pages[0]['revisions'][0]['slots']['main']['content'], 'xxxx')
+        self.assert_call(0, {'titles': 'P0|P1', 'prop': 'revisions',
+                             'rvprop': 'content', 'rvslots': 'main'})
+
+    @responses.activate
+    def test_query_page_contents_truncated(self):
+        site = self.init_content_server(max_pages=3)
+        pages = list(site.query_page_contents(pageids=range(10), batch_size=8))
+        self.assertEqual([p['pageid'] for p in pages], list(range(10)))
+        # 8 pages needed 3 rounds, so the batch was reduced to 8 // 3
+        self.assertEqual(self.batches, [8, 2])
+
+    @responses.activate
+    def test_query_page_contents_target_size(self):
+        site = self.init_content_server(max_pages=100)
+        pages = site.query_page_contents(pageids=range(10), batch_size=2, target_size=12)
+        self.assertEqual(len(list(pages)), 10)
+        self.assertEqual(self.batches, [2, 3, 3, 2])
+
+    @responses.activate
+    def test_query_page_contents_missing(self):
+        site = self.init_content_server(max_pages=1, missing={2, 3})
+        pages = list(site.query_page_contents(pageids=[1, 2, 3, 4], batch_size=4))
+        self.assertEqual([p['pageid'] for p in pages], [2, 3, 1, 4])
+        self.assertEqual(pages[0], {'pageid': 2, 'missing': True})
+
+    @responses.activate
+    def test_query_page_contents_invalid(self):
+        site = self.init_content_server(max_pages=1)
+        pages = list(site.query_page_contents(titles=['<', 'A', 'B'], batch_size=3))
+        self.assertEqual([p['title'] for p in pages], ['<', 'A', 'B'])
+        self.assertTrue(pages[0]['invalid'])
+        self.assertEqual(pages[2]['revisions'][0]['slots']['main']['content'], 'xxxx')
+
+    def test_query_page_contents_params(self):
+        site = Site('url')
+        self.assertRaises(ValueError, lambda: next(site.query_page_contents()))
+        self.assertRaises(ValueError, lambda: next(
+            site.query_page_contents(titles=['A'], pageids=[1])))
+
+    def test_modified_error(self):
+        err = ApiPagesModifiedError([1, 2])
+        self.assertEqual(err.data, [1, 2])
+        self.assertEqual(str(err), 'Pages modified during iteration: [1, 2]')
+
+    def init_content_server(self, max_pages, missing=()):
+        """
+        Simulate a server that returns content of at most max_pages per response.
+        Each page has 4 chars of content. Number of pages per request is recorded
+        """
+        self.batches = []
+
+        def callback(request):
+            params = {k: v[0] for k, v in parse_qs(urlparse(request.url).query).items()}
+            key = 'titles' if 'titles' in params else 'pageids'
+            ids = params[key].split('|')
+            if 'c' not in params:
+                self.batches.append(len(ids))
+            offset = int(params.get('c', 0))
+            pages = []
+            for i, v in enumerate(ids):
+                if key == 'pageids' and int(v) in missing:
+                    # formatversion=2 returns no title for missing page ids
+                    pages.append({'pageid': int(v), 'missing': True})
+                    continue
+                if key == 'titles' and v.startswith('<'):
+                    pages.append({'title': v, 'invalid': True,
+                                  'invalidreason': 'The requested page title contains '
+                                                   'invalid characters: "<".'})
+                    continue
+                page = {'pageid': int(v) if key == 'pageids' else i, 'title': v}
+                if offset <= i < offset + max_pages:
+                    page['revisions'] = [{'slots': {'main': {'content': 'xxxx'}}}]
+                pages.append(page)
+            result = {'query': {'pages': pages}}
+            if offset + max_pages < len(ids):
+                result['continue'] = {'c': str(offset + max_pages)}
+            return 200, {}, json.dumps(result)
+
+        api_url = 'http://example.org/api.php'
+        responses.add_callback(responses.GET, api_url, callback=callback)
+        return Site(url=api_url)
+
     def init(self, answers: List[dict]):
         api_url = 'http://example.org/api.php'
         responses.reset()
@@ -0,0 +1,138 @@
+import json
+import unittest
+from urllib.parse import urlparse, parse_qs
+
+import responses
+
+from pywikiapi import Site, QueryPlanner
+
+
+class Tests_QueryPlanner(unittest.TestCase):
+    api_url = 'http://example.org/api.php'
+
+    def init(self):
+        """Simulates a server that normalizes titles, and returns each requested prop"""
+        self.calls = []
+
+        def callback(request):
+            params = {k: v[0] for k, v in parse_qs(urlparse(request.url).query).items()}
+            self.calls.append(params)
+            props = params.get('prop', '').split('|')
+            normalized, pages = [], []
+            for pageid in params.get('pageids', '').split('|'):
+                if not pageid:
+                    continue
+                if pageid == '404':
+                    pages.append({'pageid': 404, 'missing': True})
+                    continue
+                page = {'pageid': int(pageid), 'title': chr(int(pageid))}
+                for prop in props:
+                    page[prop] = f'{prop} of {page["title"]}'
+                pages.append(page)
+            for title in params.get('titles', '').split('|'):
+                if not title:
+                    continue
+                if title[0].islower():
+                    normalized.append({'from': title, 'to': title.capitalize()})
+                    title = title.capitalize()
+                if title == 'Missing':
+                    pages.append({'title': title, 'missing': True})
+                    continue
+                page = {'pageid': ord(title[0]), 'title': title}
+                for prop in props:
+                    page[prop] = [f'{prop} of {title}'] if prop == 'categories' \
+                        else f'{prop} of {title}'
+                pages.append(page)
+            result = {'query': {'pages': pages}}
+            if normalized:
+                result['query']['normalized'] = normalized
+            return 200, {}, json.dumps(result)
+
+        responses.add_callback(responses.GET, self.api_url, callback=callback)
+        return QueryPlanner(Site(self.api_url), max_ids=3)
+
+    @responses.activate
+    def test_merge(self):
+        planner = self.init()
+        info = planner.add(titles=['A', 'b'], prop='info')
+        cats = planner.add(titles=['B', 'C', 'Missing'], prop=['categories'], cllimit=5)
+        planner.run()
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.calls[0]['titles'], 'A|b')
+        self.assertEqual(self.calls[0]['prop'], 'info')
+        self.assertNotIn('cllimit', self.calls[0])
+        self.assertEqual(self.calls[1]['titles'], 'B|C|Missing')
+        self.assertEqual(self.calls[1]['prop'], 'categories')
+        self.assertEqual(self.calls[1]['cllimit'], '5')
+        self.assertEqual([p['title'] for p in info.pages], ['A', 'B'])
+        self.assertEqual([p['title'] for p in cats.pages], ['B', 'C', 'Missing'])
+        self.assertIs(info.pages[1], cats.pages[0])
+        self.assertEqual(cats.pages[1]['categories'], ['categories of C'])
+        self.assertEqual(cats.pages[0]['info'], 'info of B')
+        self.assertEqual(planner.pending, [])
+
+    @responses.activate
+    def test_split(self):
+        planner = self.init()
+        content = planner.add(titles=['A'], prop='revisions', rvprop='content')
+        info = planner.add(titles=['A', 'B', 'C', 'D', 'E'], prop='info')
+        planner.run()
+        self.assertEqual([(c['titles'], c['prop'], c.get('rvprop')) for c in self.calls], [
+            ('A', 'revisions|info', 'content'),
+            ('B|C|D', 'info', None),
+            ('E', 'info', None),
+        ])
+        self.assertEqual(content.pages[0]['revisions'], 'revisions of A')
+        self.assertIs(info.pages[0], content.pages[0])
+        self.assertEqual([p['title'] for p in info.pages], ['A', 'B', 'C', 'D', 'E'])
+        self.assertNotIn('revisions', info.pages[1])
+
+    @responses.activate
+    def test_aliases(self):
+        planner = self.init()
+        cats = planner.add(titles='b', prop='categories')
+        info = planner.add(titles='B', prop='categories|info')
+        planner.run()
+        self.assertEqual(len(self.calls), 2)
+        self.assertIs(cats.pages[0], info.pages[0])
+        # Lists from separate calls are not concatenated
+        self.assertEqual(cats.pages[0]['categories'], ['categories of B'])
+        self.assertEqual(cats.pages[0]['info'], 'info of B')
+
+    @responses.activate
+    def test_pageids(self):
+        planner = self.init()
+        info = planner.add(pageids=[65, 404], prop='info')
+        cats = planner.add(pageids=[66, 65], prop='categories')
+        planner.run()
+        self.assertEqual([(c['pageids'], c['prop']) for c in self.calls], [
+            ('65', 'info|categories'), ('404', 'info'), ('66', 'categories')])
+        self.assertEqual([p['pageid'] for p in info.pages], [65, 404])
+        self.assertTrue(info.pages[1]['missing'])
+        self.assertIs(info.pages[0], cats.pages[1])
+        self.assertEqual(cats.pages[1]['info'], 'info of A')
+
+    @responses.activate
+    def test_incompatible(self):
+        planner = self.init()
+        first = planner.add(titles='A', prop='info')
+        second = planner.add(titles='A', prop='categories', redirects=True)
+        third = planner.add(titles='A', prop='info', inprop='url')
+        self.assertEqual(len(planner.plan()), 2)
+        planner.run()
+        self.assertEqual([c.get('prop') for c in self.calls], ['info', 'categories'])
+        self.assertEqual(len(first.pages), 1)
+        self.assertEqual(len(second.pages), 1)
+        self.assertIs(first.pages[0], third.pages[0])
+
+    def test_params(self):
+        planner = QueryPlanner(Site(self.api_url))
+        self.assertRaises(ValueError, lambda: planner.add())
+        self.assertRaises(ValueError, lambda: planner.add(titles='A', pageids=1))
+        self.assertRaises(ValueError, lambda: planner.add(titles='A', generator='links'))
+        self.assertEqual(planner.add(pageids='1').ids, [1])
+        self.assertEqual(len(planner.plan()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import json
+import unittest
+from urllib.parse import urlparse, parse_qs
+
+import responses
+
+from pywikiapi import Site, RevisionIndex, ApiPagesModifiedError
+
+
+class Tests_RevisionIndex(unittest.TestCase):
+    api_url = 'http://example.org/api.php'
+
+    def init(self, revisions, deleted=()):
+        """
+        Simulates a wiki with the given pageid -> lastrevid, returning two pages
+        per response for the generator=allpages scan
+        """
+        self.fetched = []
+
+        def callback(request):
+            params = {k: v[0] for k, v in parse_qs(urlparse(request.url).query).items()}
+            if 'pageids' in params:
+                ids = [int(v) for v in params['pageids'].split('|')]
+                self.fetched.append(ids)
+                pages = [{'pageid': i, 'missing': True} if i in deleted else
+                         {'pageid': i, 'content': f'rev {revisions[i]}'} for i in ids]
+                return 200, {}, json.dumps({'query': {'pages': pages}})
+            self.assertEqual(params['prop'], 'info')
+            ids = sorted(revisions)
+            start = int(params.get('c', 0))
+            pages = [{'pageid': i, 'lastrevid': revisions[i], 'touched': 'T'}
+                     for i in ids[start:start + 2]]
+            result = {'query': {'pages': pages}}
+            if start + 2 < len(ids):
+                result['continue'] = {'c': str(start + 2)}
+            return 200, {}, json.dumps(result)
+
+        responses.add_callback(responses.GET, self.api_url, callback=callback)
+        return Site(self.api_url)
+
+    @responses.activate
+    def test_crawl(self):
+        revisions = {1: 10, 2: 20, 3: 30, 4: 40, 5: 50}
+        site = self.init(revisions)
+        index = RevisionIndex()
+        pages = list(index.crawl(site, dict(generator='allpages'), batch_size=2,
+                                 scan_batch_size=3, prop='revisions'))
+        self.assertEqual([p['pageid'] for p in pages], [1, 2, 3, 4, 5])
+        self.assertEqual(self.fetched, [[1, 2], [3, 4], [5]])
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.get(3), (30, 'T'))
+
+        revisions[2] = 21
+        revisions[5] = 51
+        self.fetched = []
+        pages = list(index.crawl(site, dict(generator='allpages'), prop='revisions'))
+        self.assertEqual([p['content'] for p in pages], ['rev 21', 'rev 51'])
+        self.assertEqual(self.fetched, [[2, 5]])
+        self.assertEqual(index.get(2), (21, 'T'))
+
+        self.fetched = []
+        self.assertEqual(list(index.crawl(site, dict(generator='allpages'))), [])
+        self.assertEqual(self.fetched, [])
+
+    @responses.activate
+    def test_deleted_during_crawl(self):
+        revisions = {1: 10, 2: 20, 3: 30}
+        deleted = set()
+        site = self.init(revisions, deleted)
+        index = RevisionIndex()
+        index.update([dict(pageid=2, lastrevid=19, touched='T')])
+        deleted.add(2)
+        pages = list(index.crawl(site, dict(generator='allpages'), prop='revisions'))
+        self.assertEqual(sorted(p['pageid'] for p in pages), [1, 2, 3])
+        self.assertIn({'pageid': 2, 'missing': True}, pages)
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.get(2))
+
+        # Still listed by the scan, so it is fetched again, but not recorded
+        self.fetched = []
+        list(index.crawl(site, dict(generator='allpages'), prop='revisions'))
+        self.assertEqual(self.fetched, [[2]])
+        self.assertIsNone(index.get(2))
+
+    @responses.activate
+    def test_partial_crawl(self):
+        site = self.init({1: 10, 2: 20, 3: 30})
+        index = RevisionIndex()
+        pages = index.crawl(site, dict(generator='allpages'), batch_size=2)
+        self.assertEqual(next(pages)['pageid'], 1)
+        self.assertEqual(next(pages)['pageid'], 2)
+        pages.close()
+        # The last yielded page might not have been processed, so it is not recorded
+        self.assertEqual(index.get(1), (10, 'T'))
+        self.assertIsNone(index.get(2))
+
+    @responses.activate
+    def test_prune(self):
+        revisions = {1: 10, 2: 20, 3: 30}
+        site = self.init(revisions)
+        index = RevisionIndex()
+        list(index.crawl(site, dict(generator='allpages')))
+        del revisions[2]
+        self.fetched = []
+        list(index.crawl(site, dict(generator='allpages')))
+        self.assertEqual(len(index), 3)
+        list(index.crawl(site, dict(generator='allpages'), prune=True))
+        self.assertEqual(self.fetched, [])
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.get(2))
+
+    @responses.activate
+    def test_modified_during_scan(self):
+        api_url = 'http://example.org/api.php'
+        scan = [
+            {'query': {'pages': [{'pageid': 1, 'lastrevid': 10},
+                                 {'pageid': 2, 'lastrevid': 20}]},
+             'continue': {'c': '1'}},
+            {'query': {'pages': [{'pageid': 2, 'lastrevid': 21},
+                                 {'pageid': 3, 'lastrevid': 30}]}},
+        ]
+        for result in scan:
+            responses.add(responses.GET, api_url, json=result)
+        responses.add(responses.GET, api_url, json={'query': {'pages': [
+            {'pageid': 1, 'content': 'x'}, {'pageid': 3, 'content': 'y'}]}})
+        index = RevisionIndex()
+        pages = []
+        with self.assertRaises(ApiPagesModifiedError) as ctx:
+            for page in index.crawl(Site(api_url), dict(generator='allpages'), prune=True):
+                pages.append(page)
+        self.assertEqual(ctx.exception.data, [2])
+        self.assertEqual([p['pageid'] for p in pages], [1, 3])
+        self.assertEqual(index.get(3), (30, None))
+
+    def test_changed(self):
+        index = RevisionIndex()
+        index.update([{'pageid': 1, 'lastrevid': 10, 'touched': 'A'}])
+        pages = [{'pageid': 1, 'lastrevid': 10, 'touched': 'B'},
+                 {'pageid': 2, 'lastrevid': 20, 'touched': 'B'}]
+        self.assertEqual([p['pageid'] for p in index.changed(pages)], [2])
+        self.assertEqual([p['pageid'] for p in index.changed(pages, use_touched=True)], [1, 2])
+        index.delete([1])
+        self.assertEqual(len(index), 0)
+        index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import threading
+import time
+import unittest
+from urllib.parse import urlparse, parse_qs
+
+import responses
+
+from pywikiapi import Site, RequestScheduler
+
+
+class Tests_Scheduler(unittest.TestCase):
+
+    def run_queued(self, scheduler, priorities):
+        """
+        Hold the only slot until all requests with the given priorities are queued,
+        and return the order in which they were served
+        """
+        order = []
+
+        def worker(priority):
+            with scheduler.slot(priority):
+                order.append(priority)
+
+        threads = []
+        with scheduler.slot():
+            for priority in priorities:
+                threads.append(threading.Thread(target=worker, args=(priority,)))
+                threads[-1].start()
+                # wait for the thread to get into the queue to keep the order stable
+                queued = priorities[:len(threads)].count(priority)
+                while scheduler.metrics()[priority]['queued'] < queued:
+                    time.sleep(0.001)
+        for thread in threads:
+            thread.join()
+        return order
+
+    def test_priority_order(self):
+        scheduler = RequestScheduler(slots=1)
+        order = self.run_queued(scheduler, ['low', 'normal', 'high'])
+        self.assertEqual(order, ['high', 'normal', 'low'])
+
+    def test_weighted_share(self):
+        scheduler = RequestScheduler(slots=1, weights={'a': 3, 'b': 1},
+                                     default_priority='b')
+        order = self.run_queued(scheduler, ['b'] * 4 + ['a'] * 8)
+        # 'a' gets three times more slots while both are waiting
+        self.assertEqual(order[:8].count('a'), 6)
+        self.assertEqual(sorted(order), ['a'] * 8 + ['b'] * 4)
+
+    def test_interrupted_wait(self):
+        scheduler = RequestScheduler(slots=1)
+        wait = scheduler._cond.wait
+
+        def interrupted_wait(*args):
+            scheduler._cond.wait = wait
+            raise KeyboardInterrupt()
+
+        with scheduler.slot():
+            scheduler._cond.wait = interrupted_wait
+            with self.assertRaises(KeyboardInterrupt):
+                with scheduler.slot('high'):
+                    pass
+        self.assertEqual(scheduler.metrics()['high']['queued'], 0)
+        self.assertEqual(scheduler._finish['high'], scheduler._vtime)
+        # Other requests are not blocked by the interrupted one
+        order = self.run_queued(scheduler, ['low', 'high'])
+        self.assertEqual(order, ['high', 'low'])
+
+    def test_metrics(self):
+        scheduler = RequestScheduler(slots=2)
+        with scheduler.slot('high'):
+            with scheduler.slot('high'):
+                pass
+        metrics = scheduler.metrics()
+        self.assertEqual(metrics['high']['requests'], 2)
+        self.assertEqual(metrics['high']['queued'], 0)
+        self.assertEqual(metrics['low'], dict(requests=0, wait_total=0.0, wait_max=0.0,
+                                              wait_avg=0.0, queued=0))
+
+    def test_try_acquire(self):
+        scheduler = RequestScheduler(slots=1)
+        self.assertTrue(scheduler.try_acquire('low'))
+        self.assertFalse(scheduler.try_acquire())
+        scheduler.release()
+        with scheduler.slot():
+            self.assertFalse(scheduler.try_acquire())
+        self.assertEqual(scheduler.metrics()['low']['requests'], 1)
+        self.assertRaises(ValueError, lambda: scheduler.try_acquire('x'))
+
+    def test_bad_priority(self):
+        self.assertRaises(ValueError, lambda: RequestScheduler(slots=0))
+        self.assertRaises(ValueError, lambda: RequestScheduler(default_priority='x'))
+        with self.assertRaises(ValueError):
+            with RequestScheduler().slot('x'):
+                pass
+
+    @responses.activate
+    def test_site_priority(self):
+        api_url = 'http://example.org/api.php'
+        responses.add(responses.GET, api_url, json={})
+        site = Site(api_url, scheduler=RequestScheduler())
+        site('query', PRIORITY='low')
+        site('query')
+        params = parse_qs(urlparse(responses.calls[0].request.url).query)
+        self.assertNotIn('PRIORITY', params)
+        metrics = site.scheduler.metrics()
+        self.assertEqual(metrics['low']['requests'], 1)
+        self.assertEqual(metrics['normal']['requests'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+import responses
+
+from pywikiapi import Site, SessionStore, RequestScheduler
+from .utils import FakeServer
+
+
+class Tests_SessionStore(unittest.TestCase):
+    api_url = 'https://example.org/api.php'
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = SessionStore(self.dir.name)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def init(self):
+        self.server = FakeServer()
+        for method in [responses.GET, responses.POST]:
+            responses.add_callback(method, self.api_url, callback=self.server)
+
+    def site(self):
+        site = Site(self.api_url, session_store=self.store)
+        site.login('A', 'p')
+        return site
+
+    def edit(self, site):
+        return site('edit', title='T', token=site.token())['edit']['result']
+
+    @responses.activate
+    def test_reuse_session(self):
+        self.init()
+        self.assertEqual(self.edit(self.site()), 'Success')
+        self.assertEqual(self.server.requests, 4)  # login token, login, csrf token, edit
+
+        self.assertEqual(self.edit(self.site()), 'Success')
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(self.server.logins, ['A'])
+        self.assertEqual(self.server.edits, [('A', 'Atoken'), ('A', 'Atoken')])
+
+    @responses.activate
+    def test_relogin(self):
+        self.init()
+        site = self.site()
+        self.edit(site)
+        self.server.sessions.clear()
+        self.assertEqual(self.edit(site), 'Success')
+        self.assertEqual(self.server.logins, ['A', 'A'])
+        self.assertEqual(len(self.server.edits), 2)
+
+    @responses.activate
+    def test_relogin_by_other_process(self):
+        self.init()
+        site1 = self.site()
+        self.edit(site1)
+        site2 = self.site()
+        self.server.sessions.clear()
+        self.edit(site1)
+        # site2 reuses the new session of site1 instead of logging in
+        self.edit(site2)
+        self.assertEqual(self.server.logins, ['A', 'A'])
+        self.assertEqual(len(self.server.edits), 3)
+
+    @responses.activate
+    def test_keep_newer_session(self):
+        self.init()
+        site1 = self.site()
+        self.store.delete(self.api_url, 'A')
+        site2 = self.site()
+        # site1 still has a valid older session, and must not replace the new one
+        self.edit(site1)
+        state = self.store.load(self.api_url, 'A')
+        self.assertEqual(state['cookies'], site2._session_state['cookies'])
+        self.assertNotIn('csrf', state['tokens'])
+        self.assertEqual(self.edit(site2), 'Success')
+        self.assertEqual(self.store.load(self.api_url, 'A')['tokens'], {'csrf': 'Atoken'})
+
+    @responses.activate
+    def test_relogin_priority(self):
+        self.init()
+        site = Site(self.api_url, session_store=self.store, scheduler=RequestScheduler())
+        site.login('A', 'p')
+        self.server.sessions.clear()
+        self.assertEqual(site('query', meta='tokens', type='csrf', PRIORITY='low')
+                         ['query']['tokens']['csrftoken'], 'Atoken')
+        # The failed request and its retry after the login
+        self.assertEqual(site.scheduler.metrics()['low']['requests'], 2)
+
+    def test_store(self):
+        self.assertIsNone(self.store.load('url', 'user'))
+        self.store.save('url', 'user', {'cookies': [], 'tokens': {'csrf': 'x'}})
+        self.assertEqual(self.store.load('url', 'user'), {'cookies': [], 'tokens': {'csrf': 'x'}})
+        self.assertIsNone(self.store.load('url', 'other'))
+        file = self.store._file('url', 'user')
+        self.assertEqual(os.stat(str(file)).st_mode & 0o777, 0o600)
+        with open(str(file), 'w') as f:
+            f.write('{corrupted')
+        self.assertIsNone(self.store.load('url', 'user'))
+        self.store.delete('url', 'user')
+        self.store.delete('url', 'user')
+        self.assertIsNone(self.store.load('url', 'user'))
+
+
+if __name__ == '__main__':
+    unittest.main()
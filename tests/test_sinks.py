@@ -0,0 +1,104 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from pywikiapi import write_ndjson, write_arrow, write_parquet, AttrDict
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class Tests_Sinks(unittest.TestCase):
+
+    def test_ndjson(self):
+        pages = ({'pageid': i, 'title': f'Страница {i}'} for i in range(5))
+        out = io.StringIO()
+        self.assertEqual(write_ndjson(pages, out, chunk_size=2), 5)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertDictEqual(json.loads(lines[4]), {'pageid': 4, 'title': 'Страница 4'})
+        self.assertIn('Страница', lines[0])
+
+    def test_ndjson_attrdict(self):
+        out = io.StringIO()
+        self.assertEqual(write_ndjson([AttrDict(pageid=1)], out), 1)
+        self.assertEqual(out.getvalue(), '{"pageid": 1}\n')
+
+    def test_ndjson_empty(self):
+        out = io.StringIO()
+        self.assertEqual(write_ndjson([], out), 0)
+        self.assertEqual(out.getvalue(), '')
+
+    def test_bad_chunk_size(self):
+        self.assertRaises(ValueError, lambda: write_ndjson([{}], io.StringIO(), 0))
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow(self):
+        pages = [{'pageid': 1, 'title': 'A', 'lastrevid': 5},
+                 {'pageid': 2, 'title': 'B', 'missing': True},
+                 {'pageid': 3, 'title': 'C', 'categories': [{'ns': 14, 'title': 'X'}]}]
+        out = io.BytesIO()
+        self.assertEqual(write_arrow(iter(pages), out, chunk_size=1,
+                                     prop='info|categories'), 3)
+        table = pyarrow.ipc.open_stream(out.getvalue()).read_all()
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column('missing').to_pylist(), [None, True, None])
+        self.assertEqual(table.column('lastrevid').to_pylist(), [5, None, None])
+        self.assertEqual(table.column('categories').to_pylist()[2][0]['title'], 'X')
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_null_column(self):
+        pages = [{'pageid': 1, 'extra': None}, {'pageid': 2, 'extra': 'value'}]
+        out = io.BytesIO()
+        self.assertEqual(write_arrow(pages, out, chunk_size=1), 2)
+        table = pyarrow.ipc.open_stream(out.getvalue()).read_all()
+        self.assertEqual(table.column('extra').to_pylist(), [None, 'value'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_unknown_field(self):
+        pages = [{'pageid': 1}, {'pageid': 2, 'categories': [{'ns': 14, 'title': 'X'}]}]
+        with self.assertRaises(ValueError) as ctx:
+            write_arrow(pages, io.BytesIO(), chunk_size=1)
+        self.assertIn('categories', str(ctx.exception))
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_arrow_nested_fields(self):
+        pages = [{'pageid': 1, 'revisions': [
+            {'revid': 5, 'tags': ['mobile edit'], 'slots': {
+                'main': {'content': 'x'}, 'mediainfo': {'content': '{}'}}}]}]
+        out = io.BytesIO()
+        self.assertEqual(write_arrow(pages, out, prop='revisions'), 1)
+        table = pyarrow.ipc.open_stream(out.getvalue()).read_all()
+        revision = table.column('revisions').to_pylist()[0][0]
+        self.assertEqual(revision['tags'], ['mobile edit'])
+        self.assertEqual(revision['slots']['mediainfo'], {'content': '{}'})
+        self.assertEqual(revision['slots']['main']['content'], 'x')
+        self.assertEqual(table.schema.field('revisions').type.value_type.field('revid').type,
+                         pyarrow.int64())
+
+        pages.append({'pageid': 2, 'revisions': [{'revid': 6, 'newfield': 1}]})
+        with self.assertRaises(ValueError) as ctx:
+            write_arrow(pages, io.BytesIO(), chunk_size=1, prop='revisions')
+        self.assertIn('revisions.newfield', str(ctx.exception))
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+        pages = [{'pageid': i, 'title': str(i), 'pageprops': {'wikibase_item': f'Q{i}'}}
+                 for i in range(5)]
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, 'pages.parquet')
+            self.assertEqual(write_parquet(iter(pages), file, chunk_size=2,
+                                           prop=['pageprops']), 5)
+            parquet = pq.ParquetFile(file)
+            self.assertEqual(parquet.metadata.num_row_groups, 3)
+            table = parquet.read()
+        self.assertEqual(table.column('pageid').to_pylist(), list(range(5)))
+        self.assertEqual(table.column('pageprops').to_pylist()[4], [('wikibase_item', 'Q4')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import responses
+
+from pywikiapi import SitePool, ApiError
+from .utils import FakeServer
+
+
+class Tests_SitePool(unittest.TestCase):
+    api_url = 'https://example.org/api.php'
+
+    def init(self, accounts, **kwargs):
+        server = FakeServer()
+        for method in [responses.GET, responses.POST]:
+            responses.add_callback(method, self.api_url, callback=server)
+        return server, SitePool(self.api_url, accounts, **kwargs)
+
+    @responses.activate
+    def test_round_robin(self):
+        server, pool = self.init([('A', 'p'), ('B', 'p')])
+        for _ in range(4):
+            self.assertEqual(pool('edit', title='T', TOKEN='csrf')['edit']['result'], 'Success')
+        self.assertEqual(server.logins, ['A', 'B'])
+        self.assertEqual(server.edits, [('A', 'Atoken'), ('B', 'Btoken'),
+                                        ('A', 'Atoken'), ('B', 'Btoken')])
+
+    @responses.activate
+    def test_relogin(self):
+        server, pool = self.init([('A', 'p')])
+        pool('edit', title='T', TOKEN='csrf')
+        server.sessions.clear()
+        pool('edit', title='T', TOKEN='csrf')
+        self.assertEqual(server.logins, ['A', 'A'])
+        self.assertEqual(len(server.edits), 2)
+
+    @responses.activate
+    def test_relogin_once(self):
+        server, pool = self.init([('A', 'p')])
+        pool('edit', title='T', TOKEN='csrf')
+        server.expire_sessions = True
+        self.assertRaises(ApiError, lambda: pool('edit', title='T', TOKEN='csrf'))
+
+    def test_no_shared_session(self):
+        self.assertRaises(ValueError, lambda: SitePool(self.api_url, [('A', 'p')],
+                                                       session=object()))
+        self.assertRaises(ValueError, lambda: SitePool(self.api_url, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
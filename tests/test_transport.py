@@ -0,0 +1,86 @@
+import json
+import subprocess
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from pywikiapi import Site, ApiError
+from pywikiapi.transport import UrllibSession
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.reply(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        self.reply(parse_qs(body))
+
+    def reply(self, params):
+        if 'fail' in params:
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(b'Server error')
+            return
+        result = {'method': self.command,
+                  'action': params['action'][0],
+                  'cookie': self.headers['Cookie'],
+                  'agent': self.headers['User-Agent']}
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'session=abc')
+        self.end_headers()
+        self.wfile.write(json.dumps(result).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class Tests_Transport(unittest.TestCase):
+    server = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def site(self, **kwargs):
+        return Site(f'http://127.0.0.1:{self.server.server_port}/api.php',
+                    session=UrllibSession(), **kwargs)
+
+    def test_get_and_cookies(self):
+        site = self.site(headers={'User-Agent': 'test'})
+        self.assertDictEqual(site('query'), dict(
+            method='GET', action='query', cookie=None, agent='test'))
+        self.assertDictEqual(site('edit'), dict(
+            method='POST', action='edit', cookie='session=abc', agent='test'))
+
+    def test_http_error(self):
+        with self.assertRaises(ApiError) as ctx:
+            self.site()('query', fail=1)
+        self.assertEqual(ctx.exception.data,
+                         {'status_code': 500, 'text_body': 'Server error'})
+
+    def test_connection_error(self):
+        site = Site('http://127.0.0.1:1/api.php', session=UrllibSession(),
+                    retry_after_conn=0)
+        site.retry_on_connection_error = 1
+        self.assertRaises(ConnectionError, lambda: site('query'))
+
+    def test_lazy_requests_import(self):
+        code = ('import sys, pywikiapi; s = pywikiapi.Site("http://example.org"); '
+                's.headers, s.tokens; print("requests" in sys.modules)')
+        out = subprocess.run([sys.executable, '-c', code], check=True,
+                             stdout=subprocess.PIPE, universal_newlines=True).stdout
+        self.assertEqual(out.strip(), 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
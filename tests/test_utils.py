@@ -1,7 +1,8 @@
 import unittest
 from datetime import datetime as dt
 
-from pywikiapi import to_timestamp, to_datetime
+from pywikiapi import to_timestamp, to_datetime, to_epoch, to_epochs, \
+    lazy_timestamps, Timestamp, AttrDict
 from .utils import UTC, NonUTC
 
 
@@ -21,6 +22,43 @@ class Tests_Utils(unittest.TestCase):
         self.assertEqual(result, dt(year=2000, month=1, day=1, hour=2, minute=42))
         self.assertEqual(to_timestamp(result), original)
 
+    def test_to_datetime_invalid(self):
+        for value in ['2000-13-01T00:00:00Z', '2000-02-30T00:00:00Z',
+                      '2000-01-01 00:00:00Z', '2000-01-01T00:00:00', '',
+                      '2000-+1-01T00:00:00Z', '2000-01-01T 1:00:00Z',
+                      '\uff12000-01-01T00:00:00Z', '2000-1-01T00:00:00Z',
+                      '2000-01-01T00:00:00Z ']:
+            self.assertRaises(ValueError, lambda: to_datetime(value))
+            self.assertRaises(ValueError, lambda: to_epoch(value))
+            self.assertRaises(ValueError, lambda: to_epochs([value]))
+
+    def test_to_epoch(self):
+        self.assertEqual(to_epoch('1970-01-01T00:00:00Z'), 0)
+        self.assertEqual(to_epoch('2000-03-01T02:42:01Z'), 951878521)
+        self.assertEqual(to_epoch('1969-12-31T23:59:59Z'), -1)
+        self.assertEqual(to_epoch('2000-02-29T23:59:59Z'), 951868799)
+        self.assertEqual(to_epochs(['1970-01-01T00:01:00Z', None, '1970-01-01T00:02:00Z',
+                                    '2000-03-01T02:42:01Z']), [60, None, 120, 951878521])
+        for value in ['2001-02-29T00:00:00Z', '2000-01-01T24:00:00Z',
+                      '2000-01-01T00:60:00Z', '2000-01-01T00:00:60Z']:
+            self.assertRaises(ValueError, lambda: to_epoch(value))
+            self.assertRaises(ValueError, lambda: to_epochs([value]))
+
+    def test_lazy_timestamps(self):
+        hook = lazy_timestamps(AttrDict)
+        page = hook({'title': '2000-01-01T02:42:00Z',
+                     'touched': '2000-01-01T02:42:00Z',
+                     'starttimestamp': '2000-01-01T02:42:00Z',
+                     'expiry': 'infinity'})
+        self.assertIsInstance(page, AttrDict)
+        self.assertNotIsInstance(page.title, Timestamp)
+        self.assertNotIsInstance(page.expiry, Timestamp)
+        self.assertIsInstance(page.touched, Timestamp)
+        self.assertEqual(page.touched, '2000-01-01T02:42:00Z')
+        self.assertEqual(page.starttimestamp.datetime,
+                         dt(year=2000, month=1, day=1, hour=2, minute=42))
+        self.assertEqual(page.starttimestamp.epoch, 946694520)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,6 @@
+import json
 from datetime import tzinfo, timedelta as td
+from urllib.parse import urlparse, parse_qs
 
 
 class UTC(tzinfo):
@@ -25,3 +27,39 @@ class NonUTC(tzinfo):
 
     def dst(self, dt):
         return None
+
+
+class FakeServer:
+    """Simulates login, tokens, and edits, tracking which user made each edit"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.edits = []
+        self.logins = []
+        self.requests = 0
+        self.expire_sessions = False
+
+    def __call__(self, request):
+        self.requests += 1
+        params = {k: v[0] for k, v in parse_qs(urlparse(request.url).query).items()}
+        if request.body:
+            params.update({k: v[0] for k, v in parse_qs(request.body).items()})
+        cookie = request.headers.get('Cookie', '')
+        user = None if self.expire_sessions else self.sessions.get(cookie.split('=', 1)[-1])
+        headers = {}
+        if params.get('assert') == 'user' and user is None:
+            result = {'error': {'code': 'assertuserfailed'}}
+        elif params['action'] == 'login':
+            session = f's{len(self.logins)}'
+            self.sessions[session] = params['lgname']
+            self.logins.append(params['lgname'])
+            headers['Set-Cookie'] = f'session={session}'
+            result = {'login': {'result': 'Success'}}
+        elif params['action'] == 'query':
+            result = {'query': {'tokens': {params['type'] + 'token': f'{user}token'}}}
+        elif params['token'] != f'{user}token':
+            result = {'error': {'code': 'badtoken'}}
+        else:
+            self.edits.append((user, params['token']))
+            result = {'edit': {'result': 'Success'}}
+        return 200, headers, json.dumps(result)